@@ -0,0 +1,78 @@
+"""Small multiples: many regions as a grid of subplots on few pages."""
+# Copyright (c) 2020 Thomas Lehmann
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons
+# to whom the Software is furnished to do so, subject to the following conditions:
+# The above copyright notice and this permission notice shall be included in all copies
+# or substantial portions of the Software.
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import logging
+import numpy as np
+import matplotlib.dates as mdates
+import matplotlib.pyplot as plt
+
+from decimate import Decimation
+from render import Renderer
+
+
+class Atlas:
+    """Pages with a grid of small subplots, one per region.
+
+    All subplots of a page share the date axis, the fonts and the styling,
+    and a page is rendered once for all its formats, so an overview of many
+    regions costs a few renderings instead of one per region. The series are
+    reduced to the points the small subplots can show.
+    """
+
+    def __init__(self, columns, rows, width, height):
+        """Initialize atlas with given grid and size of a page in pixels."""
+        self.columns = columns
+        self.rows = rows
+        self.width = width
+        self.height = height
+
+    def pages(self, regions):
+        """Regions split into the pages of the atlas."""
+        size = self.columns * self.rows
+        return [regions[start:start + size] for start in range(0, len(regions), size)]
+
+    def render(self, title, series, exports):
+        """One page for the series [(name, dates, values, trend)] exported as [(format, file)]."""
+        figure, axes = plt.subplots(nrows=self.rows, ncols=self.columns, sharex=True,
+                                    squeeze=False)
+        dpi = figure.get_dpi()
+        figure.set_size_inches(self.width / float(dpi), self.height / float(dpi))
+        figure.suptitle(title, fontsize=8)
+        figure.subplots_adjust(left=0.04, right=0.98, bottom=0.05, top=0.92,
+                               wspace=0.3, hspace=0.45)
+
+        for target, (name, dates, values, trend) in zip(axes.flat, series):
+            keep = Decimation.indices('minmax', values, int(target.bbox.width))
+            target.plot(dates[keep], values[keep], color='#008000', linewidth=0.75)
+            target.plot(dates[keep], trend[keep], linestyle='dashed', linewidth=0.5,
+                        color='#800000')
+            # metrics may be undefined (NaN) for some days
+            finite = values[np.isfinite(values)]
+            target.set_ylim(0, max(finite.max(), 1) if len(finite) else 1)
+            target.set_title(name, fontsize=7, pad=2)
+            target.tick_params(labelsize=5, pad=1)
+            locator = mdates.AutoDateLocator(maxticks=4)
+            target.xaxis.set_major_locator(locator)
+            target.xaxis.set_major_formatter(mdates.ConciseDateFormatter(locator))
+            target.grid(alpha=0.5)
+        for target in axes.flat[len(series):]:
+            target.axis('off')
+
+        for _, filename in exports:
+            logging.info("Generating %s" % filename)
+        Renderer.export(figure, exports)
+        plt.close(figure)
@@ -0,0 +1,244 @@
+"""tool benchmark"""
+# Copyright (c) 2020 Thomas Lehmann
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons
+# to whom the Software is furnished to do so, subject to the following conditions:
+# The above copyright notice and this permission notice shall be included in all copies
+# or substantial portions of the Software.
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import os
+import sys
+import json
+import time
+import logging
+import platform
+import click
+import numpy as np
+
+import matplotlib
+matplotlib.use('Agg')
+
+from profiling import peak_memory
+from render import Renderer
+from rki_store import RkiStore
+from scripts import load_script, tool_options
+
+
+class Benchmark:
+    """Timing each stage of both tools with synthetic data of production size."""
+
+    BUNDESLAENDER = 16
+    FIRST_DAY = np.datetime64('2020-01-01', 'D')
+
+    def __init__(self, options):
+        """Initialize benchmark with command line options."""
+        self.options = options
+        self.results = []
+
+    @staticmethod
+    def initialize_logging():
+        """Initializing the logging (console only)"""
+        logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+        logging.info("Python %s", sys.version)
+        logging.info("Platform %s", platform.platform())
+
+    def measure(self, dataset, stage, items, function, *args):
+        """Running one stage, recording duration, throughput (items per second) and memory."""
+        start = time.perf_counter()
+        result = function(*args)
+        duration = time.perf_counter() - start
+        record = {'dataset': dataset, 'stage': stage, 'seconds': duration, 'items': items,
+                  'throughput': items / duration if duration > 0 else None,
+                  'peak_rss_mb': peak_memory()}
+        self.results.append(record)
+        logging.info("%-5s %-10s %9.3fs %12d items %14s items/s  peak rss %s MB",
+                     dataset, stage, duration, items,
+                     '%.1f' % record['throughput'] if record['throughput'] else '-',
+                     '%.1f' % record['peak_rss_mb'] if record['peak_rss_mb'] else '-')
+        return result
+
+    def data_file(self, name):
+        """Path of a generated file in the work folder."""
+        os.makedirs(self.options['work_dir'], exist_ok=True)
+        return os.path.join(self.options['work_dir'], name)
+
+    def generate_ecdc(self, path):
+        """Synthetic CSV in the shape of the ECDC download (newest day first per country)."""
+        random = np.random.RandomState(42)
+        days = Benchmark.FIRST_DAY + np.arange(self.options['days'])[::-1]
+        day_strings = [str(day) for day in days]
+        with open(path, 'w') as stream:
+            stream.write('dateRep,day,month,year,cases,deaths,countriesAndTerritories,geoId,'
+                         'countryterritoryCode,popData2019,continentExp,'
+                         'Cumulative_number_for_14_days_of_COVID-19_cases_per_100000\n')
+            for country in range(self.options['countries']):
+                name = 'Country_%03d' % country
+                population = random.randint(10000, 100000000)
+                cases = random.poisson(random.randint(1, 5000), len(days))
+                deaths = cases // 50
+                stream.writelines(
+                    '%s/%s/%s,%d,%d,%s,%d,%d,%s,C%03d,C%03d,%d,Continent_%d,\n' % (
+                        day[8:10], day[5:7], day[:4], int(day[8:10]), int(day[5:7]), day[:4],
+                        cases[index], deaths[index], name, country, country, population,
+                        country % 5)
+                    for index, day in enumerate(day_strings))
+
+    def generate_rki(self, path):
+        """Synthetic GeoJSON in the shape of the RKI download."""
+        random = np.random.RandomState(42)
+        days = [str(day).replace('-', '/') + ' 00:00:00'
+                for day in Benchmark.FIRST_DAY + np.arange(self.options['days'])]
+        template = '{"type":"Feature","properties":{"FID":%d,"IdBundesland":%d,' \
+            '"Bundesland":"Land %02d","Landkreis":"LK %03d","Altersgruppe":"A35-A59",' \
+            '"Geschlecht":"W","AnzahlFall":%d,"AnzahlTodesfall":%d,"Meldedatum":"%s",' \
+            '"IdLandkreis":"%05d","Datenstand":"20.11.2020, 00:00 Uhr","NeuerFall":0,' \
+            '"NeuerTodesfall":%d},"geometry":null}'
+        block = 100000
+        with open(path, 'w') as stream:
+            stream.write('{"type":"FeatureCollection","name":"RKI_COVID19","features":[\n')
+            for offset in range(0, self.options['features'], block):
+                count = min(block, self.options['features'] - offset)
+                landkreise = random.randint(0, self.options['landkreise'], count)
+                day_indices = random.randint(0, len(days), count)
+                cases = random.randint(1, 6, count)
+                deaths = (random.random_sample(count) < 0.02).astype(int)
+                stream.write(',\n'.join(
+                    template % (offset + index, landkreis % Benchmark.BUNDESLAENDER + 1,
+                                landkreis % Benchmark.BUNDESLAENDER, landkreis,
+                                cases[index], deaths[index], days[day_indices[index]],
+                                landkreis, 0 if deaths[index] else -9)
+                    for index, landkreis in enumerate(landkreise)))
+                stream.write(',\n' if offset + count < self.options['features'] else '\n')
+            stream.write(']}\n')
+
+    def prepare(self, name, generator):
+        """Generating a data file once for given size (reused by later runs)."""
+        path = self.data_file(name)
+        if not os.path.isfile(path):
+            logging.info("Generating %s", path)
+            generator(path)
+        logging.info("Using %s (%.1f MB)", path, os.path.getsize(path) / (1024.0 * 1024.0))
+        return path
+
+    def options_for(self, module, regions):
+        """Options as expected by the application of the tool."""
+        return dict(tool_options(module), data_url='synthetic', width=self.options['width'],
+                    height=self.options['height'], format=self.options['format'], cache=False,
+                    country=regions, filter=regions, filter_by='landkreis')
+
+    def render_stages(self, dataset, application, data):
+        """Timing trend fit of all regions, rendering and export for a sample of them."""
+        self.measure(dataset, 'trend', 2 * len(data), application.compute_trends, data)
+        regions = list(data)[:self.options['regions']]
+        data = [data[region] for region in regions]
+
+        formats, application.options['format'] = application.options['format'], []
+        cwd = os.getcwd()
+        os.chdir(self.options['work_dir'])
+        try:
+            def render():
+                for region, entry in zip(regions, data):
+                    application.visualize(region, entry)
+                    application.template[0].canvas.draw()
+            self.measure(dataset, 'render', len(regions), render)
+
+            application.options['format'] = formats
+            exports = [(format, filename) for region in regions
+                       for format, filename in zip(formats, application.filenames(region))]
+            self.measure(dataset, 'export', len(exports), lambda: [
+                Renderer.export(application.template[0], [export]) for export in exports])
+        finally:
+            os.chdir(cwd)
+
+    def run_ecdc(self):
+        """Stages of visualize.py."""
+        path = self.prepare('ecdc-%dx%d.csv' % (self.options['countries'], self.options['days']),
+                            self.generate_ecdc)
+        module = load_script('visualize', 'visualize.py')
+        rows = self.options['countries'] * self.options['days']
+        names = ['country_%03d' % country for country in range(self.options['countries'])]
+        application = module.Application(self.options_for(module, names))
+
+        application.df = self.measure('ecdc', 'parse', rows, lambda: module.Application.normalize(
+            module.Application.read_csv(path)))
+        self.measure('ecdc', 'index', rows, application.build_index)
+        data = self.measure('ecdc', 'aggregate', len(names) + 1, lambda: {
+            name: application.provide_concrete_data(name) for name in names + ['all']})
+        self.render_stages('ecdc', application, data)
+
+    def run_rki(self):
+        """Stages of visualize-germany.py."""
+        path = self.prepare('rki-%d.json' % self.options['features'], self.generate_rki)
+        module = load_script('visualize_germany', 'visualize-germany.py')
+        names = ['lk %03d' % landkreis for landkreis in range(self.options['landkreise'])]
+        application = module.Application(self.options_for(module, names))
+
+        def parse():
+            with open(path, 'rb') as stream:
+                return module.Application.create_df_from_json(stream)
+        features = self.measure('rki', 'parse', self.options['features'], parse)
+        application.df = self.measure('rki', 'aggregate', len(features),
+                                      RkiStore.aggregate, features)
+        del features
+        self.measure('rki', 'index', len(application.df), application.build_cube)
+        data = self.measure('rki', 'select', len(names), lambda: {
+            name: application.provide_concrete_data(name) for name in names})
+        self.render_stages('rki', application, data)
+
+    def run(self):
+        """Running the selected benchmarks and writing the report."""
+        Benchmark.initialize_logging()
+        if self.options['dataset'] in ['ecdc', 'all']:
+            self.run_ecdc()
+        if self.options['dataset'] in ['rki', 'all']:
+            self.run_rki()
+
+        if self.options['report']:
+            with open(self.options['report'], 'w') as stream:
+                json.dump({'options': self.options, 'results': self.results}, stream, indent=2)
+            logging.info("Report written to %s", self.options['report'])
+
+
+@click.command()
+@click.option('--dataset', default='all', type=click.Choice(['ecdc', 'rki', 'all']),
+              show_default=True, help="Dataset(s) to benchmark.")
+@click.option('--countries', default=250, type=int, show_default=True,
+              help="Number of countries of the synthetic ECDC data.")
+@click.option('--days', default=1500, type=int, show_default=True,
+              help="Number of days of the synthetic data.")
+@click.option('--features', default=5000000, type=int, show_default=True,
+              help="Number of features of the synthetic RKI data.")
+@click.option('--landkreise', default=400, type=int, show_default=True,
+              help="Number of Landkreise of the synthetic RKI data.")
+@click.option('--regions', default=20, type=int, show_default=True,
+              help="Number of regions rendered and exported.")
+@click.option('--width', '-w', default=1024, type=int, show_default=True,
+              help="Width in pixels for the image.")
+@click.option('--height', '-h', default=768, type=int, show_default=True,
+              help="Height in pixels for the image.")
+@click.option('--format', '-f', default=['png'], type=click.Choice(['png', 'svg', 'jpg']),
+              show_default=True, multiple=True,
+              help="File format for image (repeatable).")
+@click.option('--work-dir', default=os.path.join(os.getcwd(), 'benchmark'),
+              type=str, show_default=True, metavar="<PATH>",
+              help="Folder for generated data and images.")
+@click.option('--report', default='', type=str, metavar="<PATH>",
+              help="Path and filename of a JSON report.")
+def main(**options):
+    """Benchmark of parsing, aggregation, trend fit, rendering and export."""
+    options['format'] = list(options['format'])
+    benchmark = Benchmark(options)
+    benchmark.run()
+
+
+if __name__ == "__main__":
+    main()
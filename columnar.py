@@ -0,0 +1,168 @@
+"""Columnar binary cache with memory-mapped reads."""
+# Copyright (c) 2020 Thomas Lehmann
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons
+# to whom the Software is furnished to do so, subject to the following conditions:
+# The above copyright notice and this permission notice shall be included in all copies
+# or substantial portions of the Software.
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import os
+import json
+import time
+import struct
+import numpy as np
+import pandas as pd
+
+from metadata import source_signature
+
+
+class ColumnarCache:
+    """Normalized dataframe stored as raw columns next to the downloaded source file.
+
+    The file starts with a magic, a format version and a JSON header describing
+    each column (dtype, offset, length and - for names - the categories).
+    The columns follow as raw arrays which are memory-mapped when reading, so
+    several processes reading the same cache share the page cache and nothing
+    has to be parsed again.
+
+    Each write creates a new data file (path.<stamp>); the small file at path
+    names the current one and is replaced atomically. A data file is never
+    replaced while mapped (Windows refuses that); former data files are
+    removed by later writes once they are no longer in use.
+    """
+
+    MAGIC = b'C19COL'
+    VERSION = 4
+    ALIGNMENT = 64
+    # former data files are kept that long for readers which just found them
+    STALE_SECONDS = 60
+
+    def __init__(self, path, source):
+        """Initialize cache for given binary path and the source file it is derived from."""
+        self.path = path
+        self.source = source
+
+    def source_signature(self):
+        """Size and modification time of the source file (invalidates the cache when changed)."""
+        return source_signature(self.source)
+
+    def data_file(self):
+        """Path of the current data file (None when there is none)."""
+        if not os.path.isfile(self.path):
+            return None
+        with open(self.path, 'rb') as stream:
+            name = stream.read(256).decode('utf-8', 'replace').strip()
+        # (files of former versions are data files themselves)
+        if not name.startswith(os.path.basename(self.path) + '.') or os.sep in name:
+            return None
+        path = os.path.join(os.path.dirname(self.path), name)
+        return path if os.path.isfile(path) else None
+
+    def remove_stale_files(self, current):
+        """Removing former data files (those still mapped on Windows are removed later)."""
+        folder = os.path.dirname(self.path) or '.'
+        prefix = os.path.basename(self.path) + '.'
+        for name in os.listdir(folder):
+            path = os.path.join(folder, name)
+            if not name.startswith(prefix) or name == current:
+                continue
+            try:
+                if time.time() - os.path.getmtime(path) > ColumnarCache.STALE_SECONDS:
+                    os.remove(path)
+            except OSError:
+                pass
+
+    def read_header(self):
+        """Read the JSON header or None when the file is missing or of another version."""
+        path = self.data_file()
+        if path is None:
+            return None
+
+        with open(path, 'rb') as stream:
+            prefix = stream.read(len(ColumnarCache.MAGIC) + 8)
+            if len(prefix) < len(ColumnarCache.MAGIC) + 8 \
+                    or not prefix.startswith(ColumnarCache.MAGIC):
+                return None
+            version, size = struct.unpack('<II', prefix[len(ColumnarCache.MAGIC):])
+            if not version == ColumnarCache.VERSION:
+                return None
+            header = json.loads(stream.read(size).decode('utf-8'))
+            header['start'] = len(ColumnarCache.MAGIC) + 8 + size
+            header['path'] = path
+            return header
+
+    def is_valid(self):
+        """True when the binary cache exists, has current version and matches the source."""
+        header = self.read_header()
+        return header is not None and header['source'] == self.source_signature()
+
+    def write(self, df, metadata=None):
+        """Write dataframe columns (numbers, datetimes and categoricals) atomically."""
+        columns, arrays = [], []
+        offset = 0
+        for name in df.columns:
+            series = df[name]
+            column = {'name': name}
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                column['categories'] = [str(value) for value in series.cat.categories]
+                column['ordered'] = bool(series.cat.ordered)
+                values = series.cat.codes.values
+            else:
+                values = series.values
+
+            # aligned offsets keep the memory maps efficient
+            offset += -offset % ColumnarCache.ALIGNMENT
+            column.update({'dtype': values.dtype.str, 'offset': offset, 'length': len(values)})
+            columns.append(column)
+            arrays.append((offset, np.ascontiguousarray(values)))
+            offset += values.nbytes
+
+        header = json.dumps({'source': self.source_signature(), 'columns': columns,
+                             'metadata': metadata or {}}).encode('utf-8')
+        start = len(ColumnarCache.MAGIC) + 8 + len(header)
+        start += -start % ColumnarCache.ALIGNMENT
+        header += b' ' * (start - len(ColumnarCache.MAGIC) - 8 - len(header))
+
+        # new data file (the current one might be mapped), then switching to it
+        name = '%s.%d-%d' % (os.path.basename(self.path), time.time() * 1e6, os.getpid())
+        with open(os.path.join(os.path.dirname(self.path), name), 'wb') as stream:
+            stream.write(ColumnarCache.MAGIC)
+            stream.write(struct.pack('<II', ColumnarCache.VERSION, len(header)))
+            stream.write(header)
+            for column_offset, values in arrays:
+                stream.seek(start + column_offset)
+                values.tofile(stream)
+
+        temporary = '%s.%d.tmp' % (self.path, os.getpid())
+        with open(temporary, 'w') as stream:
+            stream.write(name)
+        os.replace(temporary, self.path)
+        self.remove_stale_files(name)
+
+    def read(self):
+        """Provide dataframe with memory-mapped columns."""
+        header = self.read_header()
+        data = {}
+        for column in header['columns']:
+            if column['length'] == 0:
+                values = np.empty(0, dtype=np.dtype(column['dtype']))
+            else:
+                values = np.memmap(header['path'], dtype=np.dtype(column['dtype']), mode='r',
+                                   offset=header['start'] + column['offset'],
+                                   shape=(column['length'],))
+            if 'categories' in column:
+                values = pd.Categorical.from_codes(values, column['categories'],
+                                                   ordered=column['ordered'])
+            data[column['name']] = values
+
+        # the columns stay memory-mapped (no consolidation into new blocks)
+        return pd.DataFrame(data, copy=False)
@@ -0,0 +1,81 @@
+"""Reducing the points of long series to what the width in pixels can show."""
+# Copyright (c) 2020 Thomas Lehmann
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons
+# to whom the Software is furnished to do so, subject to the following conditions:
+# The above copyright notice and this permission notice shall be included in all copies
+# or substantial portions of the Software.
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import numpy as np
+
+
+class Decimation:
+    """Shape preserving selection of the points of a series before plotting.
+
+    'minmax' keeps the first and the last point and the minimum and maximum
+    of each pixel column; 'lttb' (largest triangle three buckets) keeps one
+    point per pixel column, the one spanning the largest triangle with its
+    neighbours. Either way the number of points drawn is bounded by the
+    width of the axes, not by the number of days.
+    """
+
+    METHODS = ['none', 'minmax', 'lttb']
+
+    @staticmethod
+    def minmax(values, buckets):
+        """Indices of first, last, minimum and maximum of each bucket (ascending)."""
+        count = len(values)
+        if count <= 2 * buckets:
+            return np.arange(count)
+
+        bucket = np.arange(count) * buckets // count
+        # sorted by bucket, then by value: first of a bucket is its minimum, last its maximum
+        order = np.lexsort((values, bucket))
+        starts = np.searchsorted(bucket, np.arange(buckets))
+        ends = np.append(starts[1:], count) - 1
+        return np.unique(np.concatenate([[0, count - 1], order[starts], order[ends]]))
+
+    @staticmethod
+    def lttb(values, threshold):
+        """Indices of threshold points selected with largest triangle three buckets."""
+        count = len(values)
+        if threshold >= count or threshold < 3:
+            return np.arange(count)
+
+        values = np.asarray(values, dtype=np.float64)
+        # first and last point are kept, the others are split into threshold - 2 buckets
+        edges = np.linspace(1, count - 1, threshold - 1).astype(np.int64)
+        indices = np.empty(threshold, dtype=np.int64)
+        indices[0], indices[-1] = 0, count - 1
+        selected = 0
+        for bucket in range(threshold - 2):
+            start, end = edges[bucket], edges[bucket + 1]
+            following = slice(end, edges[bucket + 2]) if bucket + 2 < len(edges) \
+                else slice(count - 1, count)
+            # average point of the next bucket as third corner of the triangles
+            next_x = (following.start + following.stop - 1) / 2.0
+            next_y = values[following].mean()
+            x = np.arange(start, end)
+            span = (selected - next_x) * (values[start:end] - values[selected])
+            area = np.abs(span - (selected - x) * (next_y - values[selected]))
+            selected = start + int(np.argmax(area))
+            indices[bucket + 1] = selected
+        return indices
+
+    @staticmethod
+    def indices(method, values, pixels):
+        """Indices (or slice) of the points to plot for given method and width in pixels."""
+        if method == 'minmax':
+            return Decimation.minmax(values, max(pixels, 1))
+        if method == 'lttb':
+            return Decimation.lttb(values, max(pixels, 3))
+        return slice(None)
@@ -0,0 +1,196 @@
+"""Conditional and resumable downloads into a cache file."""
+# Copyright (c) 2020 Thomas Lehmann
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons
+# to whom the Software is furnished to do so, subject to the following conditions:
+# The above copyright notice and this permission notice shall be included in all copies
+# or substantial portions of the Software.
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import os
+import json
+import time
+import logging
+import threading
+import concurrent.futures
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class Downloader:
+    """Keeping a cache file up to date with the content of an URL.
+
+    The cache file is considered fresh for max_age seconds. Afterwards it is
+    revalidated with the ETag and Last-Modified of the last download, so an
+    unchanged source costs one request answered with 304. New content is
+    streamed in chunks into a .part file which is renamed when complete; an
+    interrupted download is resumed with a range request. When the server
+    can't be reached (or answers with an error) an existing cache file is
+    used as it is.
+    """
+
+    CHUNK_SIZE = 1024 * 1024
+    ATTEMPTS = 3
+    TIMEOUT = 60
+    SESSION = None
+    SESSION_LOCK = threading.Lock()
+
+    def __init__(self, url, path, max_age):
+        """Initialize downloader for given URL, cache file and freshness (seconds)."""
+        self.url = url
+        self.path = path
+        self.max_age = max_age
+        self.part_file = path + '.part'
+        self.metadata_file = path + '.download.json'
+
+    @staticmethod
+    def session():
+        """Session shared by all downloads (pooled connections)."""
+        with Downloader.SESSION_LOCK:
+            if Downloader.SESSION is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=4)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                Downloader.SESSION = session
+        return Downloader.SESSION
+
+    @staticmethod
+    def open(url):
+        """Streaming response for given URL (content decoded when reading from raw)."""
+        logging.info("Downloading from %s", url)
+        response = Downloader.session().get(url, stream=True, timeout=Downloader.TIMEOUT)
+        response.raise_for_status()
+        response.raw.decode_content = True
+        return response
+
+    def load_metadata(self):
+        """Validators and time of last check of the cache file (empty for another URL)."""
+        if not os.path.isfile(self.metadata_file):
+            return {}
+        with open(self.metadata_file, 'r') as stream:
+            metadata = json.load(stream)
+        return metadata if metadata.get('url') == self.url else {}
+
+    def save_metadata(self, metadata):
+        """Writing validators and time of last check."""
+        temporary = self.metadata_file + '.tmp'
+        with open(temporary, 'w') as stream:
+            json.dump(dict(metadata, url=self.url), stream, indent=2)
+        os.replace(temporary, self.metadata_file)
+
+    def is_fresh(self, metadata):
+        """True when the cache file exists and has been checked less than max_age ago."""
+        if not os.path.isfile(self.path):
+            return False
+        # cache files of former versions are checked by their modification time
+        checked = metadata.get('checked', os.path.getmtime(self.path))
+        return time.time() - checked < self.max_age
+
+    def refresh(self):
+        """Ensure an up to date cache file; True when new content has been downloaded."""
+        metadata = self.load_metadata()
+        if self.is_fresh(metadata):
+            logging.info("Cache file %s is fresh", self.path)
+            return False
+
+        try:
+            return self.download_with_retries(metadata)
+        except requests.RequestException as exception:
+            if not os.path.isfile(self.path):
+                raise
+            # an outdated cache file is better than none (the next run tries again)
+            logging.warning("Download from %s failed (%s), using cache file %s",
+                            self.url, exception, self.path)
+            return False
+
+    def download_with_retries(self, metadata):
+        """Download resumed after interruptions; True when new content has been downloaded."""
+        for attempt in range(1, Downloader.ATTEMPTS + 1):
+            try:
+                return self.download(metadata)
+            except (requests.ConnectionError, requests.Timeout,
+                    requests.exceptions.ChunkedEncodingError) as exception:
+                if attempt == Downloader.ATTEMPTS:
+                    raise
+                logging.warning("Download interrupted (%s), resuming", exception)
+                metadata = self.load_metadata()
+        return False
+
+    def headers(self, metadata):
+        """Request headers for revalidation and for resuming a partial download."""
+        headers = {}
+        if os.path.isfile(self.path):
+            if metadata.get('etag'):
+                headers['If-None-Match'] = metadata['etag']
+            if metadata.get('last_modified'):
+                headers['If-Modified-Since'] = metadata['last_modified']
+
+        partial = metadata.get('partial', {})
+        validator = partial.get('etag') or partial.get('last_modified')
+        if validator and os.path.isfile(self.part_file):
+            # ranges refer to the identity encoding
+            headers['Range'] = 'bytes=%d-' % os.path.getsize(self.part_file)
+            headers['If-Range'] = validator
+            headers['Accept-Encoding'] = 'identity'
+        return headers
+
+    def download(self, metadata):
+        """Conditional (and possibly resumed) download; True when new content arrived."""
+        headers = self.headers(metadata)
+        logging.info("Downloading from %s", self.url)
+        with Downloader.session().get(self.url, headers=headers, stream=True,
+                                      timeout=Downloader.TIMEOUT) as response:
+            if response.status_code == 304:
+                logging.info("Not modified since last download: %s", self.url)
+                self.save_metadata(dict(metadata, checked=time.time()))
+                return False
+
+            if response.status_code == 416:
+                # partial file does not match the content (anymore)
+                os.remove(self.part_file)
+                return self.download(dict(metadata, partial={}))
+
+            response.raise_for_status()
+            validators = {'etag': response.headers.get('ETag'),
+                          'last_modified': response.headers.get('Last-Modified')}
+            # allows resuming when the download gets interrupted
+            self.save_metadata(dict(metadata, partial=validators))
+
+            mode = 'ab' if response.status_code == 206 else 'wb'
+            if mode == 'ab':
+                logging.info("Resuming download at byte %s", headers['Range'][6:-1])
+            with open(self.part_file, mode) as stream:
+                for chunk in response.iter_content(Downloader.CHUNK_SIZE):
+                    stream.write(chunk)
+
+        os.replace(self.part_file, self.path)
+        self.save_metadata(dict(validators, checked=time.time()))
+        return True
+
+
+def refresh(downloaders, on_arrival=None):
+    """Refreshing the cache files of all downloaders concurrently.
+
+    on_arrival(downloader, changed) is called (in the calling thread) as soon
+    as the cache file of a downloader is up to date, while the other
+    downloads continue. Returns the downloaders which got new content.
+    """
+    changed = []
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(len(downloaders), 1)) as executor:
+        futures = {executor.submit(downloader.refresh): downloader for downloader in downloaders}
+        for future in concurrent.futures.as_completed(futures):
+            downloader = futures[future]
+            if future.result():
+                changed.append(downloader)
+            if on_arrival is not None:
+                on_arrival(downloader, downloader in changed)
+    return changed
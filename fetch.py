@@ -0,0 +1,96 @@
+"""tool fetch"""
+# Copyright (c) 2020 Thomas Lehmann
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons
+# to whom the Software is furnished to do so, subject to the following conditions:
+# The above copyright notice and this permission notice shall be included in all copies
+# or substantial portions of the Software.
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import os
+import sys
+import time
+import logging
+import platform
+import click
+
+from download import refresh
+from scripts import load_application
+
+
+class Application:
+    """Application refreshing the cache files of both tools at once."""
+
+    def __init__(self, options):
+        """Initialize application with command line options."""
+        self.options = options
+
+    @staticmethod
+    def initialize_logging():
+        """Initializing the logging (console only)"""
+        logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+        logging.info("Python %s", sys.version)
+        logging.info("Platform %s", platform.platform())
+
+    def applications(self):
+        """Applications of the tools selected by the options."""
+        urls = {'ecdc': self.options['data_url'], 'rki': self.options['germany_data_url']}
+        cache_files = {'ecdc': self.options['cache_file'],
+                       'rki': self.options['germany_cache_file']}
+        names = ['ecdc', 'rki'] if self.options['dataset'] == 'all' else [self.options['dataset']]
+        return [load_application(name, cache_file=cache_files[name],
+                                 cache_max_age=self.options['cache_max_age'],
+                                 data_url=urls[name])
+                for name in names]
+
+    def run(self):
+        """Downloading concurrently; each cache file is parsed as soon as it is complete."""
+        Application.initialize_logging()
+        logging.info("cache max age: %(cache_max_age)d seconds", self.options)
+
+        start = time.perf_counter()
+        applications = {application.downloader(): application
+                        for application in self.applications()}
+
+        def parse(downloader, changed):
+            logging.info("%s %s after %.3fs", downloader.path,
+                         "downloaded" if changed else "unchanged", time.perf_counter() - start)
+            # creates (or updates) binary cache and region names used by the next run of the tool
+            applications[downloader].load_data(download=False)
+
+        refresh(list(applications), parse)
+        logging.info("Done after %.3fs", time.perf_counter() - start)
+
+
+@click.command()
+@click.option('--dataset', default='all', type=click.Choice(['ecdc', 'rki', 'all']),
+              show_default=True, help="Dataset(s) to fetch.")
+@click.option('--data-url', default='', type=str, metavar="<URL>",
+              help="URL of the ECDC data (default: the one of visualize.py).")
+@click.option('--germany-data-url', default='', type=str, metavar="<URL>",
+              help="URL of the RKI data (default: the one of visualize-germany.py).")
+@click.option('--cache-file', default=os.path.join(os.getcwd(), 'covid19.csv'),
+              type=str, show_default=True, metavar="<PATH>",
+              help="Path and filename of the cache file of the ECDC data.")
+@click.option('--germany-cache-file', default=os.path.join(os.getcwd(), 'covid19-germany.json'),
+              type=str, show_default=True, metavar="<PATH>",
+              help="Path and filename of the cache file of the RKI data.")
+@click.option('--cache-max-age', default=3600, type=int, show_default=True,
+              metavar="<SECONDS>",
+              help="Seconds a cache file is used before checking for new data.")
+def main(**options):
+    """Downloading the data of visualize.py and visualize-germany.py concurrently."""
+    application = Application(options)
+    application.run()
+
+
+if __name__ == "__main__":
+    main()
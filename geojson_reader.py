@@ -0,0 +1,191 @@
+"""Streaming reader for the features of a GeoJSON feature collection."""
+# Copyright (c) 2020 Thomas Lehmann
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons
+# to whom the Software is furnished to do so, subject to the following conditions:
+# The above copyright notice and this permission notice shall be included in all copies
+# or substantial portions of the Software.
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import re
+import codecs
+import json
+import numpy as np
+import pandas as pd
+
+
+class FeatureReader:
+    """Iterating the features of a GeoJSON stream without loading the whole document.
+
+    The stream is read in chunks of text; each feature is decoded on its own
+    and the consumed part of the buffer is dropped, so memory depends on the
+    chunk size only and not on the size of the file.
+    """
+
+    CHUNK_SIZE = 1024 * 1024
+    SEPARATORS = re.compile(r'[\s,]*')
+
+    def __init__(self, stream, chunk_size=CHUNK_SIZE):
+        """Initialize reader for a binary (UTF-8) or text stream."""
+        self.stream = stream
+        self.chunk_size = chunk_size
+        # binary chunks are decoded here (the stream is neither wrapped nor closed)
+        self.decoder = codecs.getincrementaldecoder('utf-8')() \
+            if isinstance(stream.read(0), bytes) else None
+
+    def read_chunk(self, buffer):
+        """Append next chunk to the buffer (error when the stream ends unexpectedly)."""
+        chunk = self.stream.read(self.chunk_size)
+        if not chunk:
+            raise ValueError("Unexpected end of GeoJSON stream")
+        if self.decoder is not None:
+            # a character might be split between two chunks
+            chunk = self.decoder.decode(chunk)
+        return buffer + chunk
+
+    def seek_features(self):
+        """Read until the opening bracket of the features array; returns remaining text."""
+        buffer = ''
+        while True:
+            match = re.search(r'"features"\s*:\s*\[', buffer)
+            if match:
+                return buffer[match.end():]
+            # keep a tail since the key might be split between two chunks
+            buffer = self.read_chunk(buffer[-32:])
+
+    def __iter__(self):
+        """Provide one feature (dictionary) after the other."""
+        decoder = json.JSONDecoder()
+        buffer, position = self.seek_features(), 0
+        while True:
+            position = FeatureReader.SEPARATORS.match(buffer, position).end()
+            if position == len(buffer):
+                buffer, position = self.read_chunk(''), 0
+                continue
+
+            if buffer[position] == ']':
+                return
+
+            try:
+                feature, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                # feature incomplete; continue with next chunk
+                buffer, position = self.read_chunk(buffer[position:]), 0
+                continue
+
+            yield feature
+
+            if position > self.chunk_size:
+                buffer, position = buffer[position:], 0
+
+
+class RkiColumns:
+    """Sums of cases and deaths per (date, Bundesland, Landkreis), filled chunk by chunk.
+
+    Bundesland, Landkreis and Meldedatum are stored as codes into the distinct
+    values seen so far. Each chunk of features is added to the sums of the
+    distinct keys (one sort and bincount per chunk), so memory depends on the
+    number of keys and the chunk size, not on the number of features. The
+    dates are converted once per distinct value when creating the dataframe.
+
+    The counts are those of the current publication (NeuerFall and
+    NeuerTodesfall in 0 or 1). With delta=True only the changes against the
+    previous publication are collected (flags -1 or 1), all other features
+    are skipped.
+    """
+
+    CHUNK_SIZE = 64 * 1024
+    NAMES = {'bundesland': 'Bundesland', 'landkreis': 'Landkreis', 'date': 'Meldedatum'}
+    COUNTS = {'cases': ('AnzahlFall', 'NeuerFall'), 'deaths': ('AnzahlTodesfall', 'NeuerTodesfall')}
+    # bits of each code in the combined key (date, Bundesland, Landkreis)
+    CODE_BITS = 20
+
+    def __init__(self, chunk_size=CHUNK_SIZE, delta=False):
+        """Initialize empty buffers."""
+        self.chunk_size = chunk_size
+        self.flags = (-1, 1) if delta else (0, 1)
+        self.delta = delta
+        self.features = 0
+        self.categories = {column: {} for column in RkiColumns.NAMES}
+        self.pending = {column: [] for column in list(RkiColumns.NAMES) + list(RkiColumns.COUNTS)}
+        self.keys = np.empty(0, dtype=np.int64)
+        self.sums = {column: np.empty(0, dtype=np.int64) for column in RkiColumns.COUNTS}
+
+    def add(self, properties):
+        """Add properties of one feature."""
+        counts = [properties[field] if properties.get(flag, 0) in self.flags else 0
+                  for field, flag in RkiColumns.COUNTS.values()]
+        if self.delta and not any(counts):
+            return
+
+        for column, field in RkiColumns.NAMES.items():
+            categories = self.categories[column]
+            value = properties[field]
+            code = categories.get(value)
+            if code is None:
+                code = categories[value] = len(categories)
+            self.pending[column].append(code)
+
+        for column, count in zip(RkiColumns.COUNTS, counts):
+            self.pending[column].append(count)
+
+        if len(self.pending['cases']) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        """Adding the pending features to the sums of their keys."""
+        if not self.pending['cases']:
+            return
+
+        codes = [np.array(self.pending[column], dtype=np.int64)
+                 for column in ['date', 'bundesland', 'landkreis']]
+        keys = (codes[0] << (2 * RkiColumns.CODE_BITS)) \
+            | (codes[1] << RkiColumns.CODE_BITS) | codes[2]
+        self.features += len(keys)
+
+        self.keys, inverse = np.unique(np.concatenate([self.keys, keys]), return_inverse=True)
+        for column in RkiColumns.COUNTS:
+            counts = np.concatenate([self.sums[column],
+                                     np.array(self.pending[column], dtype=np.int64)])
+            self.sums[column] = np.bincount(inverse.reshape(-1), weights=counts,
+                                            minlength=len(self.keys)).round().astype(np.int64)
+        for values in self.pending.values():
+            values.clear()
+
+    def to_frame(self):
+        """Dataframe with dates, categorical names and int32 counts (one row per key)."""
+        self.flush()
+        mask = (1 << RkiColumns.CODE_BITS) - 1
+        # vectorized date conversion over distinct values ('2020/03/15 00:00:00')
+        dates = np.array([value[:10].replace('/', '-') for value in self.categories['date']],
+                         dtype='datetime64[D]')
+
+        data = {'date': dates[self.keys >> (2 * RkiColumns.CODE_BITS)].astype('datetime64[ns]')}
+        for column, codes in [('bundesland', (self.keys >> RkiColumns.CODE_BITS) & mask),
+                              ('landkreis', self.keys & mask)]:
+            data[column] = pd.Categorical.from_codes(codes, list(self.categories[column]))
+        for column in RkiColumns.COUNTS:
+            data[column] = self.sums[column].astype(np.int32)
+        return pd.DataFrame(data)
+
+    @staticmethod
+    def read(stream):
+        """Read all features of the RKI GeoJSON stream into a dataframe."""
+        columns = RkiColumns()
+        for feature in FeatureReader(stream):
+            columns.add(feature['properties'])
+        return columns.to_frame()
+
+    @staticmethod
+    def publication_date(properties):
+        """Date of the publication ('Datenstand', like '20.11.2020, 00:00 Uhr')."""
+        day, month, year = properties['Datenstand'][:10].split('.')
+        return np.datetime64('%s-%s-%s' % (year, month, day), 'D')
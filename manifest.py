@@ -0,0 +1,73 @@
+"""Hashes of the inputs of exported images (unchanged images are not rendered again)."""
+# Copyright (c) 2020 Thomas Lehmann
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons
+# to whom the Software is furnished to do so, subject to the following conditions:
+# The above copyright notice and this permission notice shall be included in all copies
+# or substantial portions of the Software.
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import os
+import json
+import hashlib
+import logging
+import numpy as np
+
+
+class RenderManifest:
+    """Hash of the input (data and render options) of each exported file.
+
+    A file is exported again only when the hash of its input differs from
+    the one recorded with the last export or when the file does not exist
+    anymore. The manifest is a JSON file next to the images.
+    """
+
+    def __init__(self, path):
+        """Initialize manifest (loading the entries of former runs)."""
+        self.path = path
+        self.entries = {}
+        self.modified = False
+        if os.path.isfile(path):
+            with open(path, 'r') as stream:
+                self.entries = json.load(stream)
+
+    @staticmethod
+    def digest(*parts):
+        """Hash of the parts (arrays by their content, other values by their repr)."""
+        sha = hashlib.sha256()
+        for part in parts:
+            if isinstance(part, np.ndarray):
+                sha.update(part.dtype.str.encode())
+                sha.update(np.ascontiguousarray(part).tobytes())
+            else:
+                sha.update(repr(part).encode())
+            sha.update(b'\0')
+        return sha.hexdigest()
+
+    def is_current(self, filename, digest):
+        """True when the file exists and has been exported from the same input."""
+        return self.entries.get(filename) == digest and os.path.isfile(filename)
+
+    def record(self, filename, digest):
+        """Remembering the input of an exported file."""
+        self.entries[filename] = digest
+        self.modified = True
+
+    def save(self):
+        """Writing the manifest (when files have been exported)."""
+        if not self.modified:
+            return
+        temporary = self.path + '.tmp'
+        with open(temporary, 'w') as stream:
+            json.dump(self.entries, stream, indent=2, sort_keys=True)
+        os.replace(temporary, self.path)
+        self.modified = False
+        logging.info("Manifest written to %s", self.path)
@@ -0,0 +1,64 @@
+"""Region names of a cache file, readable without loading the data."""
+# Copyright (c) 2020 Thomas Lehmann
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons
+# to whom the Software is furnished to do so, subject to the following conditions:
+# The above copyright notice and this permission notice shall be included in all copies
+# or substantial portions of the Software.
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import os
+import json
+
+
+def source_signature(path):
+    """Size and modification time of a source file (invalidates files derived from it)."""
+    stat = os.stat(path)
+    return {'size': stat.st_size, 'mtime': stat.st_mtime_ns}
+
+
+class RegionMetadata:
+    """Small JSON file with the region names of each level next to the cache file.
+
+    The file is written whenever the data of the cache file have been loaded
+    and is valid as long as the cache file is unchanged. Reading it requires
+    the standard library only, so listing the regions neither imports pandas
+    nor matplotlib.
+    """
+
+    VERSION = 2
+
+    def __init__(self, path, source):
+        """Initialize metadata for given path and the source file it describes."""
+        self.path = path
+        self.source = source
+
+    def read(self):
+        """Region names by level (None when missing, of another version or outdated)."""
+        if not os.path.isfile(self.path) or not os.path.isfile(self.source):
+            return None
+        try:
+            with open(self.path, 'r') as stream:
+                metadata = json.load(stream)
+        except ValueError:
+            return None
+        if not metadata.get('version') == RegionMetadata.VERSION \
+                or not metadata.get('source') == source_signature(self.source):
+            return None
+        return metadata['regions']
+
+    def write(self, regions):
+        """Write the region names by level atomically."""
+        temporary = self.path + '.tmp'
+        with open(temporary, 'w') as stream:
+            json.dump({'version': RegionMetadata.VERSION,
+                       'source': source_signature(self.source), 'regions': regions}, stream)
+        os.replace(temporary, self.path)
@@ -0,0 +1,153 @@
+"""Derived metrics of the countries, their continents and the world."""
+# Copyright (c) 2020 Thomas Lehmann
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons
+# to whom the Software is furnished to do so, subject to the following conditions:
+# The above copyright notice and this permission notice shall be included in all copies
+# or substantial portions of the Software.
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import numpy as np
+
+
+class MetricsEngine:
+    """Cases and deaths per day of all countries, continents and the world as matrices.
+
+    One pass over the rows fills [day, country] matrices (bincount on the day
+    and the country code); the continents are sums over their countries and
+    the world is the sum over all of them, so each region of each level is a
+    column. A metric (incidence per 100k, rolling sum, doubling time) is
+    computed for all columns of a level at once when first requested and is
+    kept until the data version changes.
+    """
+
+    LEVELS = ['country', 'continent', 'all']
+    METRICS = ['per-day', 'incidence', 'rolling-sum', 'doubling-time']
+    NAMES = ['cases', 'deaths']
+
+    def __init__(self):
+        """Initialize engine (without data)."""
+        self.version = None
+        self.days = None
+        self.columns = {}
+        self.values = {}
+        self.population = {}
+        self.curves = {}
+
+    def update(self, version, df):
+        """Summing up the rows (date, cases, deaths, country, population, continent) once."""
+        if self.days is not None and version == self.version:
+            return
+
+        self.version = version
+        self.curves = {}
+        # days with data (as the days of a groupby on the date; no sort of the rows required)
+        dates = df['date'].values.astype('datetime64[D]')
+        first = dates.min() if len(dates) else np.datetime64('today', 'D')
+        day = (dates - first).astype(np.int64)
+        present = np.bincount(day) > 0
+        day = (np.cumsum(present) - 1)[day]
+        self.days = (first + np.flatnonzero(present)).astype(df['date'].values.dtype)
+        country = df['countriesAndTerritories'].cat.codes.values.astype(np.int64)
+        countries = df['countriesAndTerritories'].cat.categories
+        continent = df['continent'].cat.codes.values.astype(np.int64)
+        continents = df['continent'].cat.categories
+
+        # rows without country name are left out
+        known = country >= 0
+        day, country, continent = day[known], country[known], continent[known]
+
+        # continent (one-hot matrix for summing along the country axis) and population
+        membership = np.zeros((len(countries), len(continents)), dtype=np.int64)
+        membership[country[continent >= 0], continent[continent >= 0]] = 1
+        population = np.zeros(len(countries), dtype=np.float64)
+        population[country] = df['population'].values[known]
+
+        for name in MetricsEngine.NAMES:
+            flat = np.bincount(day * len(countries) + country, weights=df[name].values[known],
+                               minlength=len(self.days) * len(countries))
+            cube = flat.round().astype(np.int64).reshape(len(self.days), len(countries))
+            self.values[name] = {
+                'country': cube,
+                'continent': cube.dot(membership),
+                'all': cube.sum(axis=1).reshape(-1, 1)}
+
+        self.population = {'country': population, 'continent': population.dot(membership),
+                           'all': np.array([population.sum()])}
+        self.columns = {
+            'country': {str(name).lower(): column for column, name in enumerate(countries)},
+            'continent': {str(name).lower(): column for column, name in enumerate(continents)},
+            'all': {'all': 0}}
+
+    def contains(self, level, key):
+        """True when the lowercase region name exists for given level."""
+        return key in self.columns[level]
+
+    def names(self, level):
+        """Lowercase region names of given level."""
+        return sorted(self.columns[level].keys())
+
+    def level(self, key):
+        """Level of a region name ('all', a continent or a country)."""
+        if key == 'all':
+            return 'all'
+        return 'continent' if key in self.columns['continent'] else 'country'
+
+    @staticmethod
+    def shifted(totals, window):
+        """Totals of window days before each day (zero at the start)."""
+        before = np.zeros_like(totals)
+        before[window:] = totals[:-window]
+        return before
+
+    @staticmethod
+    def rolling_sum(values, window):
+        """Sum of the last window days for each day (and column); fewer days at the start."""
+        totals = np.cumsum(values, axis=0)
+        return totals - MetricsEngine.shifted(totals, window)
+
+    @staticmethod
+    def doubling_time(values, window):
+        """Days until the cumulative values double at the growth of the last window days."""
+        totals = np.cumsum(values, axis=0).astype(np.float64)
+        before = MetricsEngine.shifted(totals, window)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            curve = window * np.log(2.0) / np.log(totals / before)
+        # no growth (or nothing to grow from): no doubling time
+        curve[~((before > 0) & (totals > before))] = np.nan
+        return curve
+
+    def curve(self, level, name, metric, window):
+        """Metric of cases or deaths for all regions of a level (computed once)."""
+        values = self.values[name][level]
+        if metric == 'per-day':
+            return values
+
+        key = level, name, metric, window
+        if key not in self.curves:
+            if metric == 'rolling-sum':
+                curve = MetricsEngine.rolling_sum(values, window)
+            elif metric == 'incidence':
+                population = self.population[level]
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    curve = MetricsEngine.rolling_sum(values, window) * 100000.0 / population
+                curve[:, population <= 0] = np.nan
+            else:
+                curve = MetricsEngine.doubling_time(values, window)
+            self.curves[key] = curve
+        return self.curves[key]
+
+    def series(self, key, metric='per-day', window=7):
+        """Days and values (dictionary of cases and deaths) of one region for given metric."""
+        level = self.level(key)
+        column = self.columns[level][key]
+        return self.days, {name: self.curve(level, name, metric, window)[:, column]
+                           for name in MetricsEngine.NAMES}
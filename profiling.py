@@ -0,0 +1,158 @@
+"""Timing and memory of the processing stages."""
+# Copyright (c) 2020 Thomas Lehmann
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons
+# to whom the Software is furnished to do so, subject to the following conditions:
+# The above copyright notice and this permission notice shall be included in all copies
+# or substantial portions of the Software.
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import sys
+import json
+import time
+import pstats
+import cProfile
+import logging
+import contextlib
+import tracemalloc
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def peak_memory():
+    """Peak resident set size of the process in MB (None when not available)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS bytes
+    return peak / (1024.0 * 1024.0 if sys.platform == 'darwin' else 1024.0)
+
+
+def frame_memory(df):
+    """Memory of a dataframe in MB (including the strings of object columns)."""
+    return df.memory_usage(deep=True).sum() / (1024.0 * 1024.0)
+
+
+def raw_frame_memory(df):
+    """Memory of a dataframe in MB as read without categorical dtypes.
+
+    Each row of a categorical column then holds its own string object (a
+    pointer and the string), which is what pandas.read_csv creates for a
+    text column by default.
+    """
+    total = 0
+    for name in df.columns:
+        column = df[name]
+        if str(column.dtype) != 'category':
+            total += column.memory_usage(index=False, deep=True)
+            continue
+        sizes = [sys.getsizeof(value) for value in column.cat.categories]
+        codes = column.cat.codes.values
+        # missing values (code -1) are a shared float NaN
+        total += 8 * len(codes) + sum(sizes[code] * count for code, count in enumerate(
+            np.bincount(codes[codes >= 0], minlength=len(sizes))))
+    return total / (1024.0 * 1024.0)
+
+
+class Profiler:
+    """Recording wall time, CPU time and peak memory for each stage.
+
+    Stages are recorded with an optional region (country, Bundesland,
+    Landkreis) and detail (like the filename of an export). With hot_region
+    each region runs with cProfile and the statistics of the slowest one
+    are kept for the report. A disabled profiler records nothing.
+
+    The peak memory of a stage is the highest memory traced by tracemalloc
+    (Python objects and numpy arrays) while the stage is running; the tracer
+    is started with an enabled profiler. Python before 3.9 can't reset the
+    peak of the tracer, there the peak is the one since the start of tracing.
+    """
+
+    def __init__(self, enabled=False, hot_region=False):
+        """Initialize profiler."""
+        self.enabled = enabled
+        self.hot_region = enabled and hot_region
+        self.stages = []
+        self.regions = {}
+        self.hottest = None
+        # peak memory of each running stage (nested stages)
+        self.peaks = []
+        if enabled and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def collect_peak(self):
+        """Passing the traced peak since the last call to all running stages."""
+        _, peak = tracemalloc.get_traced_memory()
+        self.peaks = [max(value, peak) for value in self.peaks]
+        if hasattr(tracemalloc, 'reset_peak'):
+            tracemalloc.reset_peak()
+
+    @contextlib.contextmanager
+    def stage(self, name, region=None, detail=None):
+        """Measuring the code running inside the with statement."""
+        if not self.enabled:
+            yield
+            return
+
+        self.collect_peak()
+        self.peaks.append(tracemalloc.get_traced_memory()[0])
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+            self.collect_peak()
+            self.stages.append({
+                'stage': name, 'region': region, 'detail': detail,
+                'wall_seconds': wall, 'cpu_seconds': cpu,
+                'peak_memory_mb': self.peaks.pop() / (1024.0 * 1024.0)})
+
+    @contextlib.contextmanager
+    def region(self, name):
+        """Measuring all stages of one region (with cProfile when requested)."""
+        if not self.enabled:
+            yield
+            return
+
+        profile = cProfile.Profile() if self.hot_region else None
+        wall = time.perf_counter()
+        if profile:
+            profile.enable()
+        try:
+            yield
+        finally:
+            if profile:
+                profile.disable()
+            duration = time.perf_counter() - wall
+            self.regions[name] = duration
+            if profile and (self.hottest is None or duration > self.hottest[1]):
+                self.hottest = (name, duration, profile)
+
+    def write(self, path):
+        """Writing the JSON report (and the cProfile data of the slowest region)."""
+        if not self.enabled:
+            return
+
+        report = {'stages': self.stages, 'regions': self.regions}
+        if self.hottest:
+            name, duration, profile = self.hottest
+            profile_path = path.rsplit('.', 1)[0] + '.prof'
+            pstats.Stats(profile).dump_stats(profile_path)
+            report['hot_region'] = {'region': name, 'wall_seconds': duration,
+                                    'profile': profile_path}
+
+        with open(path, 'w') as stream:
+            json.dump(report, stream, indent=2)
+        logging.info("Profile written to %s", path)
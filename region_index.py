@@ -0,0 +1,82 @@
+"""Index of regions (countries, Bundesländer, Landkreise) into a sorted dataframe."""
+# Copyright (c) 2020 Thomas Lehmann
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons
+# to whom the Software is furnished to do so, subject to the following conditions:
+# The above copyright notice and this permission notice shall be included in all copies
+# or substantial portions of the Software.
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import numpy as np
+
+
+class RegionIndex:
+    """Lowercase region name to rows of a dataframe sorted once by region and date.
+
+    The frame is sorted by the given categorical columns (in order) and then by
+    date, so each region of the first column is a contiguous slice. For nested
+    columns (Landkreis within Bundesland) the same holds for the second one.
+    Regions which are not contiguous end up as an array of row positions.
+    """
+
+    def __init__(self, df, columns, order_by='date'):
+        """Sort the frame once and build the lookup for each of the columns."""
+        order = RegionIndex.order(df, columns, order_by)
+        if np.array_equal(order, np.arange(len(order))):
+            # already sorted (like the binary cache): the rows are not copied
+            self.df = df
+        else:
+            self.df = df.take(order).reset_index(drop=True)
+        self.rows = {}
+
+        for name in columns:
+            codes = self.df[name].cat.codes.values
+            # start of each run of equal codes
+            starts = np.concatenate([[0], np.flatnonzero(np.diff(codes)) + 1])
+            stops = np.concatenate([starts[1:], [len(codes)]])
+
+            rows = {}
+            for start, stop in zip(starts, stops):
+                if codes[start] < 0:
+                    continue
+                key = str(self.df[name].cat.categories[codes[start]]).lower()
+                rows.setdefault(key, []).append((start, stop))
+            self.rows[name] = {key: RegionIndex.combine(ranges) for key, ranges in rows.items()}
+
+    @staticmethod
+    def order(df, columns, order_by='date'):
+        """Row positions sorting the frame by the categorical columns (in order) and date."""
+        keys = [df[order_by].values] + [df[name].cat.codes.values for name in reversed(columns)]
+        return np.lexsort(keys)
+
+    @staticmethod
+    def sort(df, columns, order_by='date'):
+        """Frame sorted by the categorical columns (in order) and date."""
+        return df.take(RegionIndex.order(df, columns, order_by)).reset_index(drop=True)
+
+    @staticmethod
+    def combine(ranges):
+        """One range as slice, otherwise all row positions of the ranges."""
+        if len(ranges) == 1:
+            return slice(*ranges[0])
+        return np.concatenate([np.arange(start, stop) for start, stop in ranges])
+
+    def contains(self, column, key):
+        """True when the lowercase region name exists for given column."""
+        return key in self.rows[column]
+
+    def names(self, column):
+        """Lowercase region names for given column."""
+        return sorted(self.rows[column].keys())
+
+    def lookup(self, column, key):
+        """Rows (sorted by date) of given region."""
+        return self.df.iloc[self.rows[column][key]]
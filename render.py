@@ -0,0 +1,72 @@
+"""Reusing figures and exporting them with as few renderings as possible."""
+# Copyright (c) 2020 Thomas Lehmann
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons
+# to whom the Software is furnished to do so, subject to the following conditions:
+# The above copyright notice and this permission notice shall be included in all copies
+# or substantial portions of the Software.
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import numpy as np
+
+try:
+    from PIL import Image
+except ImportError:  # pragma: no cover
+    Image = None
+
+from profiling import Profiler
+
+
+class NoDataError(ValueError):
+    """No day of a region reaches the initial cases (nothing to plot)."""
+
+
+class Renderer:
+    """Helpers for a template figure which is reused for each region."""
+
+    RASTER_FORMATS = {'png': 'PNG', 'jpg': 'JPEG'}
+    JPEG_QUALITY = 95
+
+    @staticmethod
+    def update(target, x, values, trend, title, average=None):
+        """Replacing data line, trend line (average line) and title of an axes plotted before."""
+        data_line, trend_line = target.lines[:2]
+        data_line.set_data(x, values)
+        trend_line.set_data(x, trend)
+        if average is not None:
+            target.lines[2].set_data(x, average)
+        target.set_title(title)
+        # the y limits are set explicitly; the dates require rescaling
+        target.relim()
+        target.autoscale_view(scalex=True, scaley=False)
+
+    @staticmethod
+    def export(figure, exports, profiler=None, region=None):
+        """Saving figure for each (format, filename); raster formats share one rendering."""
+        profiler = profiler or Profiler()
+        raster = [(format, filename) for format, filename in exports
+                  if format in Renderer.RASTER_FORMATS and Image is not None]
+        if raster:
+            with profiler.stage('render', region):
+                figure.canvas.draw()
+                image = Image.fromarray(np.asarray(figure.canvas.buffer_rgba()))
+            for format, filename in raster:
+                with profiler.stage('savefig', region, filename):
+                    if format == 'png':
+                        image.save(filename, format='PNG')
+                    else:
+                        image.convert('RGB').save(filename, format='JPEG',
+                                                  quality=Renderer.JPEG_QUALITY)
+
+        for format, filename in exports:
+            if (format, filename) not in raster:
+                with profiler.stage('savefig', region, filename):
+                    figure.savefig(filename, format=format)
@@ -0,0 +1,128 @@
+"""Aggregated RKI data updated incrementally with each publication."""
+# Copyright (c) 2020 Thomas Lehmann
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons
+# to whom the Software is furnished to do so, subject to the following conditions:
+# The above copyright notice and this permission notice shall be included in all copies
+# or substantial portions of the Software.
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import logging
+import itertools
+import numpy as np
+import pandas as pd
+
+from columnar import ColumnarCache
+from profiling import frame_memory
+from geojson_reader import FeatureReader, RkiColumns
+
+
+class RkiStore:
+    """(date, Bundesland, Landkreis) -> (cases, deaths) kept on disk between runs.
+
+    The store remembers the publication date (watermark) of the data it has
+    been built from. When the next publication (watermark plus one day)
+    arrives, only the features flagged as changed against the previous
+    publication are collected and added to the stored rows: rows of new
+    reporting days are appended and the days whose totals changed are
+    recomputed. Any other publication leads to a full rebuild.
+    """
+
+    KEYS = ['date', 'bundesland', 'landkreis']
+
+    def __init__(self, path, source):
+        """Initialize store file derived from given source (GeoJSON) file."""
+        self.cache = ColumnarCache(path, source)
+
+    @staticmethod
+    def sorted_categories(frames):
+        """Categorical names with the same (sorted) categories in all frames."""
+        categories = {name: sorted(set().union(*[frame[name].cat.categories for frame in frames]))
+                      for name in RkiStore.KEYS[1:]}
+        return [frame.assign(**{name: frame[name].cat.set_categories(categories[name])
+                                for name in categories})
+                for frame in frames]
+
+    @staticmethod
+    def aggregate(df):
+        """Sum of cases and deaths per date, Bundesland and Landkreis (sorted by date)."""
+        # grouping by the codes of the names (sorted categories: sorted names)
+        features = RkiStore.sorted_categories([df])[0]
+        rows = features.groupby(RkiStore.KEYS, sort=True, observed=True)[['cases', 'deaths']]
+        # (not all versions of pandas sort the observed categories)
+        rows = rows.sum().reset_index().sort_values(by=RkiStore.KEYS)
+        rows = rows[(rows['cases'] != 0) | (rows['deaths'] != 0)].reset_index(drop=True)
+
+        for name in RkiStore.KEYS[1:]:
+            rows[name] = rows[name].cat.remove_unused_categories()
+        for name in ['cases', 'deaths']:
+            rows[name] = rows[name].astype(np.int32)
+        logging.info("Aggregated %d sums (%.1f MB) into %d rows (%.1f MB)",
+                     len(df), frame_memory(df), len(rows), frame_memory(rows))
+        return rows
+
+    def load(self):
+        """Stored rows; updated first when the source file has changed."""
+        header = self.cache.read_header()
+        if header is not None and header['source'] == self.cache.source_signature():
+            return self.cache.read()
+
+        previous = self.cache.read() if header is not None else None
+        watermark = header.get('metadata', {}).get('watermark') if header is not None else None
+
+        with open(self.cache.source, 'rb') as stream:
+            features = iter(FeatureReader(stream))
+            first = next(features, None)
+            if first is None:
+                return RkiStore.aggregate(RkiColumns().to_frame())
+
+            publication = RkiColumns.publication_date(first['properties'])
+            if previous is not None and str(publication) == watermark:
+                logging.info("Publication %s already ingested", publication)
+                rows = previous
+            else:
+                delta = previous is not None and watermark is not None \
+                    and str(publication - np.timedelta64(1, 'D')) == watermark
+                logging.info("Ingesting publication %s (%s)", publication,
+                             "changes since %s" % watermark if delta else "full rebuild")
+
+                columns = RkiColumns(delta=delta)
+                for feature in itertools.chain([first], features):
+                    columns.add(feature['properties'])
+                columns.flush()
+                logging.info("Read %d features into %d sums", columns.features, len(columns.keys))
+                rows = RkiStore.aggregate(columns.to_frame())
+                if delta:
+                    rows = RkiStore.merge(previous, rows)
+
+        self.cache.write(rows, metadata={'watermark': str(publication)})
+        return self.cache.read()
+
+    @staticmethod
+    def merge(previous, changes):
+        """Applying the changes of a publication to the stored rows."""
+        changed = np.unique(changes['date'].values)
+        appended = changed[changed > previous['date'].values.max()] \
+            if len(previous) else changed
+        logging.info("%d days appended, %d days recomputed",
+                     len(appended), len(changed) - len(appended))
+
+        # rows of unchanged days are taken as they are
+        previous, changes = RkiStore.sorted_categories([previous, changes])
+        unchanged = previous[~previous['date'].isin(changed)]
+        revised = RkiStore.aggregate(pd.concat([previous[previous['date'].isin(changed)],
+                                                changes]))
+
+        rows = pd.concat(RkiStore.sorted_categories([unchanged, revised]))
+        rows = rows.sort_values(by=RkiStore.KEYS).reset_index(drop=True)
+        for name in RkiStore.KEYS[1:]:
+            rows[name] = rows[name].cat.remove_unused_categories()
+        return rows
@@ -0,0 +1,79 @@
+"""Dense rollup of cases and deaths per day and Landkreis."""
+# Copyright (c) 2020 Thomas Lehmann
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons
+# to whom the Software is furnished to do so, subject to the following conditions:
+# The above copyright notice and this permission notice shall be included in all copies
+# or substantial portions of the Software.
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import numpy as np
+
+
+class RollupCube:
+    """Cases and deaths as arrays indexed by [day, region] for each level.
+
+    The Landkreis level is filled once from the data; the Bundesland level is
+    the sum over the Landkreise mapped to each Bundesland and the national
+    totals are the sum over all Landkreise. Selecting any region of any
+    level is an array slice afterwards.
+    """
+
+    LEVELS = ['bundesland', 'landkreis']
+    METRICS = ['cases', 'deaths']
+
+    def __init__(self, df):
+        """Build the cube from rows with date, bundesland, landkreis, cases and deaths."""
+        days = df['date'].values.astype('datetime64[D]')
+        first = days.min() if len(days) else np.datetime64('today', 'D')
+        day = (days - first).astype(np.int64)
+        self.dates = first + np.arange(day.max() + 1 if len(day) else 0)
+
+        landkreis = df['landkreis'].cat.codes.values.astype(np.int64)
+        count = len(df['landkreis'].cat.categories)
+        # Bundesland of each Landkreis (one-hot matrix for summing along the Landkreis axis)
+        membership = np.zeros((count, len(df['bundesland'].cat.categories)), dtype=np.int64)
+        membership[landkreis, df['bundesland'].cat.codes.values] = 1
+
+        self.values, self.columns = {}, {}
+        for metric in RollupCube.METRICS:
+            flat = np.bincount(day * count + landkreis, weights=df[metric].values,
+                               minlength=len(self.dates) * count)
+            cube = flat.round().astype(np.int64).reshape(len(self.dates), count)
+            self.values[metric] = {
+                'landkreis': cube,
+                'bundesland': cube.dot(membership),
+                'all': cube.sum(axis=1).reshape(-1, 1)}
+
+        for level in RollupCube.LEVELS:
+            self.columns[level] = {str(name).lower(): column
+                                   for column, name in enumerate(df[level].cat.categories)}
+        self.columns['all'] = {'all': 0}
+
+    def contains(self, level, key):
+        """True when the lowercase region name exists for given level."""
+        return key in self.columns[level]
+
+    def names(self, level):
+        """Lowercase region names of given level."""
+        return sorted(self.columns[level].keys())
+
+    def series(self, level, key):
+        """Dates and per day values (dictionary by metric) for one region ('all': national)."""
+        if key == 'all':
+            level = 'all'
+        column = self.columns[level][key]
+        values = {metric: self.values[metric][level][:, column] for metric in RollupCube.METRICS}
+
+        # days before the first report of the region are not part of its series
+        reported = np.flatnonzero(values['cases'] | values['deaths'])
+        start = reported[0] if len(reported) else len(self.dates)
+        return self.dates[start:], {metric: series[start:] for metric, series in values.items()}
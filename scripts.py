@@ -0,0 +1,52 @@
+"""Loading the command line tools as modules."""
+# Copyright (c) 2020 Thomas Lehmann
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons
+# to whom the Software is furnished to do so, subject to the following conditions:
+# The above copyright notice and this permission notice shall be included in all copies
+# or substantial portions of the Software.
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import os
+import importlib.util
+
+# scripts of the tools by dataset
+TOOLS = {'ecdc': ('visualize', 'visualize.py'),
+         'rki': ('visualize_germany', 'visualize-germany.py')}
+
+# options differing from the command line defaults when a tool is used as module
+# (no viewer, no regions, no manifest, cache file given by the caller)
+TOOL_OPTIONS = {'viewer': False, 'cache': True, 'manifest': False, 'country': [], 'filter': []}
+
+
+def load_script(name, filename):
+    """Loading one of the tools as module (the filename might not be a valid module name)."""
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), filename)
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def tool_options(module):
+    """Options of a tool: the defaults of its command line and the TOOL_OPTIONS."""
+    options = {param.name: param.default for param in module.main.params}
+    options.update({name: value for name, value in TOOL_OPTIONS.items() if name in options})
+    return options
+
+
+def load_application(dataset, **options):
+    """Application of the tool for given dataset ('ecdc' or 'rki') with given options."""
+    module = load_script(*TOOLS[dataset])
+    options = dict(tool_options(module), **options)
+    # URL of the tool unless given
+    options['data_url'] = options.get('data_url') or module.Application.DATA_URL
+    return module.Application(options)
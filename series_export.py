@@ -0,0 +1,98 @@
+"""Per day series of many regions as NumPy or Parquet file with a JSON index."""
+# Copyright (c) 2020 Thomas Lehmann
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons
+# to whom the Software is furnished to do so, subject to the following conditions:
+# The above copyright notice and this permission notice shall be included in all copies
+# or substantial portions of the Software.
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import os
+import json
+import zipfile
+import numpy as np
+
+
+class SeriesExport:
+    """Writing the series of the regions one by one (memory does not grow with them).
+
+    With npz each array of a region is written as '<key>/<name>.npy' into one
+    zip file, which numpy.load reads as usual ('<key>/<name>'). With parquet
+    (requires pyarrow) each region is one row group of a table in long format.
+    The JSON index has the information of each region (first day, totals,
+    days, key or row group) and the metadata of the export.
+    """
+
+    FORMATS = ['npz', 'parquet']
+
+    def __init__(self, path, format):
+        """Initialize export for given path (without extension) and format."""
+        self.path = path
+        self.format = format
+
+    @staticmethod
+    def is_available(format):
+        """True when the format can be written (parquet requires pyarrow)."""
+        if format == 'parquet':
+            # imported here only: the import is slow and parquet is optional
+            try:
+                import pyarrow.parquet  # noqa: F401 pylint: disable=unused-import
+            except ImportError:  # pragma: no cover
+                return False
+        return True
+
+    def filenames(self):
+        """Filenames of data and index."""
+        return '%s.%s' % (self.path, self.format), self.path + '.json'
+
+    @staticmethod
+    def write_npz(path, series):
+        """Arrays of each region (key, info, arrays) into a zip file; yields the index entries."""
+        with zipfile.ZipFile(path, 'w', allowZip64=True) as archive:
+            for key, info, arrays in series:
+                for name, values in arrays.items():
+                    with archive.open('%s/%s.npy' % (key, name), 'w', force_zip64=True) as stream:
+                        np.lib.format.write_array(stream, np.ascontiguousarray(values))
+                yield dict(info, key=key)
+
+    @staticmethod
+    def write_parquet(path, series):
+        """One row group per region (key, info, arrays); yields the index entries."""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        writer = None
+        try:
+            for row_group, (key, info, arrays) in enumerate(series):
+                length = len(next(iter(arrays.values())))
+                columns = {'region': pa.array([key] * length, pa.string())}
+                columns.update((name, pa.array(values)) for name, values in arrays.items())
+                table = pa.table(columns)
+                if writer is None:
+                    writer = pq.ParquetWriter(path, table.schema)
+                # all row groups have the types of the first region
+                writer.write_table(table.cast(writer.schema))
+                yield dict(info, key=key, row_group=row_group)
+        finally:
+            if writer is not None:
+                writer.close()
+
+    def write(self, series, metadata):
+        """Writing the series (iterable of key, info, arrays) and the index (atomically)."""
+        path, index_path = self.filenames()
+        writer = SeriesExport.write_npz if self.format == 'npz' else SeriesExport.write_parquet
+        regions = list(writer(path + '.tmp', series))
+        os.replace(path + '.tmp', path)
+
+        index = dict(metadata, format=self.format, file=os.path.basename(path), regions=regions)
+        with open(index_path + '.tmp', 'w') as stream:
+            json.dump(index, stream, separators=(',', ':'))
+        os.replace(index_path + '.tmp', index_path)
+        return len(regions)
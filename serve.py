@@ -0,0 +1,319 @@
+"""tool serve"""
+# Copyright (c) 2020 Thomas Lehmann
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons
+# to whom the Software is furnished to do so, subject to the following conditions:
+# The above copyright notice and this permission notice shall be included in all copies
+# or substantial portions of the Software.
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import io
+import os
+import sys
+import time
+import platform
+import logging
+import threading
+import collections
+from urllib.parse import urlsplit, parse_qs, unquote
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import click
+
+import matplotlib
+matplotlib.use('Agg')
+
+from download import refresh
+from render import NoDataError, Renderer
+from scripts import load_application
+
+
+class ImageCache:
+    """Rendered images, least recently used ones are dropped above max_bytes."""
+
+    def __init__(self, max_bytes):
+        """Initialize empty cache limited to given number of bytes."""
+        self.max_bytes = max_bytes
+        self.images = collections.OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        """Image for given key (None when not cached)."""
+        with self.lock:
+            image = self.images.get(key)
+            if image is not None:
+                self.images.move_to_end(key)
+            return image
+
+    def put(self, key, image):
+        """Adding an image (dropping the least recently used ones when required)."""
+        with self.lock:
+            if key in self.images:
+                self.size -= len(self.images.pop(key))
+            self.images[key] = image
+            self.size += len(image)
+            while self.size > self.max_bytes and len(self.images) > 1:
+                self.size -= len(self.images.popitem(last=False)[1])
+
+
+class Dataset:
+    """Application of one of the tools with its data kept in memory.
+
+    The data are loaded once and reloaded when the cache file has changed
+    (checked at most every reload_interval seconds); the server downloads at
+    start only, fetch.py updates the cache files later on. Rendering reuses the
+    template figure of the application and is therefore serialized.
+    """
+
+    def __init__(self, application, reload_interval):
+        """Initialize dataset for given application (data are loaded by reload)."""
+        self.application = application
+        self.reload_interval = reload_interval
+        self.signature = None
+        self.checked = 0.0
+        self.lock = threading.Lock()
+
+    @property
+    def version(self):
+        """Version of the data in memory (part of the keys of the image cache)."""
+        return self.application.version
+
+    def source_signature(self):
+        """Size and modification time of the cache file (None when missing)."""
+        path = self.application.options['cache_file']
+        if not os.path.isfile(path):
+            return None
+        status = os.stat(path)
+        return status.st_size, status.st_mtime
+
+    def reload(self):
+        """Loading the data again when the cache file has changed."""
+        with self.lock:
+            if time.time() - self.checked < self.reload_interval:
+                return
+            if self.signature is None or self.source_signature() != self.signature:
+                logging.info("Loading %s", self.application.options['cache_file'])
+                self.application.load_data(download=False)
+                self.signature = self.source_signature()
+            self.checked = time.time()
+
+    def render(self, region, options, format):
+        """Image of one region for given options (None when the region does not exist)."""
+        with self.lock:
+            application = self.application
+            application.options.update(options)
+            if not application.contains(region):
+                return None
+
+            width, height = application.options['width'], application.options['height']
+            if application.template is not None:
+                figure = application.template[0]
+                figure.set_size_inches(width / float(figure.get_dpi()),
+                                       height / float(figure.get_dpi()))
+
+            figure = application.visualize(region, application.provide_concrete_data(region))
+            stream = io.BytesIO()
+            Renderer.export(figure, [(format, stream)])
+            return stream.getvalue()
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    """Images of the countries and of Germany (Bundesland, Landkreis) by URL."""
+
+    CONTENT_TYPES = {'png': 'image/png', 'svg': 'image/svg+xml', 'jpg': 'image/jpeg'}
+    LEVELS = ['bundesland', 'landkreis']
+    # accepted range of the query parameters
+    LIMITS = {'width': (64, 4096), 'height': (64, 4096), 'initial_cases': (0, 10 ** 9)}
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        """Requests are logged with the logging of the application."""
+        logging.info("%s - %s", self.address_string(), format % args)
+
+    def route(self, path):
+        """Dataset, options and region for the path (None when not matching)."""
+        parts = [unquote(part) for part in path.strip('/').split('/')]
+        if len(parts) == 2 and parts[0] == 'country':
+            dataset, options = 'ecdc', {}
+        elif len(parts) == 3 and parts[0] == 'germany' and parts[1] in RequestHandler.LEVELS:
+            dataset, options = 'rki', {'filter_by': parts[1]}
+        else:
+            return None
+
+        region, _, format = parts[-1].rpartition('.')
+        if dataset not in self.server.datasets or format not in RequestHandler.CONTENT_TYPES:
+            return None
+        return dataset, options, region.lower(), format
+
+    @staticmethod
+    def render(dataset, region, options, format):
+        """Image of the region (None when it does not exist)."""
+        # names in filenames have '-' instead of spaces
+        for candidate in [region, region.replace('-', ' ')]:
+            image = dataset.render(candidate, options, format)
+            if image is not None:
+                return image
+        return None
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """Rendering the requested image (or taking it from the cache)."""
+        url = urlsplit(self.path)
+        route = self.route(url.path)
+        if route is None:
+            self.send_error(404, "Use /country/<name>.png or /germany/<level>/<name>.png")
+            return
+
+        name, options, region, format = route
+        try:
+            query = {key: int(values[-1]) for key, values in parse_qs(url.query).items()
+                     if key in RequestHandler.LIMITS}
+        except ValueError:
+            self.send_error(400, "width, height and initial_cases are integers")
+            return
+        options.update({key: query.get(key, self.server.defaults[key])
+                        for key in RequestHandler.LIMITS})
+        for key, (minimum, maximum) in RequestHandler.LIMITS.items():
+            if not minimum <= options[key] <= maximum:
+                self.send_error(400, "%s must be between %d and %d" % (key, minimum, maximum))
+                return
+
+        dataset = self.server.datasets[name]
+        dataset.reload()
+        key = (name, options.get('filter_by'), region, options['width'], options['height'],
+               format, options['initial_cases'], dataset.version)
+        image = self.server.images.get(key)
+        if image is None:
+            try:
+                image = self.render(dataset, region, options, format)
+            except NoDataError as exception:
+                # like initial_cases above all values of the region
+                self.send_error(404, str(exception))
+                return
+            except Exception:  # pylint: disable=broad-except
+                logging.exception("Rendering %s failed", self.path)
+                self.send_error(500, "Rendering '%s' failed" % region)
+                return
+            if image is not None:
+                self.server.images.put(key, image)
+        if image is None:
+            self.send_error(404, "No data for '%s'" % region)
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', RequestHandler.CONTENT_TYPES[format])
+        self.send_header('Content-Length', str(len(image)))
+        self.end_headers()
+        self.wfile.write(image)
+
+
+class RenderServer(ThreadingHTTPServer):
+    """HTTP server with the datasets and the image cache."""
+
+    daemon_threads = True
+
+    def __init__(self, address, datasets, images, defaults):
+        """Initialize server for given datasets (by name), image cache and default options."""
+        super().__init__(address, RequestHandler)
+        self.datasets = datasets
+        self.images = images
+        self.defaults = defaults
+
+
+class Application:
+    """Application serving the images of both tools."""
+
+    def __init__(self, options):
+        """Initialize application with command line options."""
+        self.options = options
+
+    @staticmethod
+    def initialize_logging():
+        """Initializing the logging (console only)"""
+        logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+        logging.info("Python %s", sys.version)
+        logging.info("Platform %s", platform.platform())
+
+    def datasets(self):
+        """Datasets selected by the options (downloaded concurrently, loaded on arrival)."""
+        urls = {'ecdc': self.options['data_url'], 'rki': self.options['germany_data_url']}
+        cache_files = {'ecdc': self.options['cache_file'],
+                       'rki': self.options['germany_cache_file']}
+        names = ['ecdc', 'rki'] if self.options['dataset'] == 'all' else [self.options['dataset']]
+        datasets = {}
+        for name in names:
+            # the server renders one image at a time (no files)
+            application = load_application(
+                name, format=[], width=self.options['width'], height=self.options['height'],
+                initial_cases=self.options['initial_cases'], cache_file=cache_files[name],
+                cache_max_age=self.options['cache_max_age'], data_url=urls[name])
+            datasets[name] = Dataset(application, self.options['reload_interval'])
+
+        downloaders = {dataset.application.downloader(): dataset
+                       for dataset in datasets.values()}
+        refresh(list(downloaders), lambda downloader, _: downloaders[downloader].reload())
+        return datasets
+
+    def run(self):
+        """Running the server until interrupted."""
+        Application.initialize_logging()
+        logging.info("address: %(host)s:%(port)d", self.options)
+        logging.info("image cache: %(image_cache_size)d MB", self.options)
+        logging.info("reload interval: %(reload_interval)d seconds", self.options)
+
+        server = RenderServer((self.options['host'], self.options['port']), self.datasets(),
+                              ImageCache(self.options['image_cache_size'] * 1024 * 1024),
+                              self.options)
+        logging.info("Serving on http://%s:%d", *server.server_address[:2])
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            logging.info("Stopped")
+        finally:
+            server.server_close()
+
+
+@click.command()
+@click.option('--host', default='127.0.0.1', type=str, show_default=True,
+              help="Address the server is listening on.")
+@click.option('--port', default=8080, type=int, show_default=True,
+              help="Port the server is listening on.")
+@click.option('--dataset', default='all', type=click.Choice(['ecdc', 'rki', 'all']),
+              show_default=True, help="Dataset(s) to serve.")
+@click.option('--width', '-w', default=1024, type=int, show_default=True,
+              help="Default width in pixels for the images.")
+@click.option('--height', '-h', default=768, type=int, show_default=True,
+              help="Default height in pixels for the images.")
+@click.option('--initial-cases', default=0, type=int, show_default=True,
+              help="Default for ignoring intial cases less than than given value.")
+@click.option('--data-url', default='', type=str, metavar="<URL>",
+              help="URL of the ECDC data (default: the one of visualize.py).")
+@click.option('--germany-data-url', default='', type=str, metavar="<URL>",
+              help="URL of the RKI data (default: the one of visualize-germany.py).")
+@click.option('--cache-file', default=os.path.join(os.getcwd(), 'covid19.csv'),
+              type=str, show_default=True, metavar="<PATH>",
+              help="Path and filename of the cache file of the ECDC data.")
+@click.option('--germany-cache-file', default=os.path.join(os.getcwd(), 'covid19-germany.json'),
+              type=str, show_default=True, metavar="<PATH>",
+              help="Path and filename of the cache file of the RKI data.")
+@click.option('--cache-max-age', default=3600, type=int, show_default=True,
+              metavar="<SECONDS>",
+              help="Seconds a cache file is used before checking for new data.")
+@click.option('--reload-interval', default=10, type=int, show_default=True,
+              metavar="<SECONDS>", help="Seconds between checks of the cache files for changes.")
+@click.option('--image-cache-size', default=64, type=int, show_default=True,
+              metavar="<MB>", help="Memory for rendered images.")
+def main(**options):
+    """Serving the images of visualize.py and visualize-germany.py over HTTP."""
+    application = Application(options)
+    application.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""Stand-in for the ECDC and RKI servers: static files with validators and ranges."""
+# Copyright (c) 2020 Thomas Lehmann
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons
+# to whom the Software is furnished to do so, subject to the following conditions:
+# The above copyright notice and this permission notice shall be included in all copies
+# or substantial portions of the Software.
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import os
+import time
+import hashlib
+import logging
+import threading
+import email.utils
+from urllib.parse import urlsplit, unquote
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import click
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Files of a directory like the ECDC CSV and the RKI GeoJSON are served.
+
+    Like the real servers the responses carry an ETag and a Last-Modified
+    header, a matching If-None-Match (or If-Modified-Since) is answered with
+    304 and a range request 'bytes=<start>-' with a matching If-Range with 206
+    (416 when the start is beyond the end of the file).
+    """
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        """Requests are logged with the logging of the application."""
+        logging.info("%s - %s", self.address_string(), format % args)
+
+    def send_response(self, code, message=None):
+        """Sending the status line (remembering the request and its status)."""
+        self.server.requests.append((self.path, code, dict(self.headers)))
+        super().send_response(code, message)
+
+    def validators(self, path):
+        """ETag and Last-Modified of the file."""
+        with open(path, 'rb') as stream:
+            etag = '"%s"' % hashlib.sha256(stream.read()).hexdigest()
+        return etag, email.utils.formatdate(os.path.getmtime(path), usegmt=True)
+
+    def is_not_modified(self, etag, last_modified):
+        """True when the client has the current content already."""
+        if 'If-None-Match' in self.headers:
+            return self.headers['If-None-Match'] == etag
+        if 'If-Modified-Since' in self.headers:
+            since = email.utils.parsedate_to_datetime(self.headers['If-Modified-Since'])
+            return email.utils.parsedate_to_datetime(last_modified) <= since
+        return False
+
+    def start(self, etag, last_modified):
+        """Start of the requested range (0 without a range or when the content has changed)."""
+        value = self.headers.get('Range', '')
+        if not value.startswith('bytes=') or not value.endswith('-'):
+            return 0
+        if self.headers.get('If-Range') not in (None, etag, last_modified):
+            return 0
+        return int(value[6:-1])
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """Sending the file (or parts of it) for the path."""
+        name = unquote(urlsplit(self.path).path).strip('/')
+        path = os.path.join(self.server.directory, name)
+        if not name or '/' in name or not os.path.isfile(path):
+            self.send_error(404, "Unknown file %s" % name)
+            return
+
+        time.sleep(self.server.delay)
+        etag, last_modified = self.validators(path)
+        if self.is_not_modified(etag, last_modified):
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+
+        size = os.path.getsize(path)
+        start = self.start(etag, last_modified)
+        if start > 0 and start >= size:
+            self.send_response(416)
+            self.send_header('Content-Range', 'bytes */%d' % size)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        if start > 0:
+            self.send_response(206)
+            self.send_header('Content-Range', 'bytes %d-%d/%d' % (start, size - 1, size))
+        else:
+            self.send_response(200)
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', last_modified)
+        self.send_header('Accept-Ranges', 'bytes')
+        self.send_header('Content-Length', str(size - start))
+        self.end_headers()
+        with open(path, 'rb') as stream:
+            stream.seek(start)
+            self.wfile.write(stream.read())
+
+
+class StandInServer(ThreadingHTTPServer):
+    """Serving the files of a directory (with a delay per request in seconds)."""
+
+    daemon_threads = True
+
+    def __init__(self, directory, host='127.0.0.1', port=0, delay=0.0):
+        """Initialize server (port 0: any free port)."""
+        super().__init__((host, port), StandInHandler)
+        self.directory = directory
+        self.delay = delay
+        self.requests = []
+        self.thread = None
+
+    def url(self, name):
+        """URL of a file of the directory."""
+        return 'http://%s:%d/%s' % (self.server_address[0], self.server_address[1], name)
+
+    def start(self):
+        """Serving in a background thread."""
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """Stopping the background thread."""
+        self.shutdown()
+        self.thread.join()
+        self.server_close()
+
+    def __enter__(self):
+        """Serving in a background thread."""
+        return self.start()
+
+    def __exit__(self, *args):
+        """Stopping the background thread."""
+        self.stop()
+
+
+@click.command()
+@click.option('--host', default='127.0.0.1', type=str, show_default=True,
+              help="Address the server is listening on.")
+@click.option('--port', default=8000, type=int, show_default=True,
+              help="Port the server is listening on.")
+@click.option('--directory', default=os.getcwd(), type=str, show_default=True,
+              metavar="<PATH>", help="Directory with the files (covid19.csv, ...).")
+@click.option('--delay', default=0.0, type=float, show_default=True, metavar="<SECONDS>",
+              help="Latency added to each request.")
+def main(**options):
+    """Serving local copies of the ECDC and RKI data for testing the downloads."""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    server = StandInServer(options['directory'], options['host'], options['port'],
+                           options['delay'])
+    logging.info("Serving %s at %s", options['directory'], server.url(''))
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
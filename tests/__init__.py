@@ -0,0 +1 @@
+"""Tests of the downloads, the rendering and the scripts."""
@@ -0,0 +1,136 @@
+"""Conditional and resumable downloads against the stand-in server."""
+import os
+import json
+import shutil
+import logging
+import tempfile
+import unittest
+import requests
+
+from download import Downloader
+from stand_in_server import StandInServer
+
+CSV = ''.join('%02d/03/2020,%d,0,Germany\n' % (day, day * 10) for day in range(1, 29))
+GEOJSON = json.dumps({'type': 'FeatureCollection', 'features': [
+    {'type': 'Feature', 'properties': {'FID': index, 'Bundesland': 'Hessen',
+                                       'AnzahlFall': index % 3}} for index in range(500)]})
+
+
+class DownloadTest(unittest.TestCase):
+    """Revalidation, resuming and invalid ranges of the Downloader."""
+
+    def setUp(self):
+        """Source files served by a stand-in server, empty cache directory."""
+        logging.disable(logging.INFO)
+        self.source = tempfile.mkdtemp()
+        self.cache = tempfile.mkdtemp()
+        for name, content in [('covid19.csv', CSV), ('covid19-germany.json', GEOJSON)]:
+            with open(os.path.join(self.source, name), 'w') as stream:
+                stream.write(content)
+        self.server = StandInServer(self.source).start()
+
+    def tearDown(self):
+        """Stopping the server, removing the files."""
+        self.server.stop()
+        shutil.rmtree(self.source)
+        shutil.rmtree(self.cache)
+        logging.disable(logging.NOTSET)
+
+    def downloader(self, name):
+        """Downloader for a served file which revalidates on each refresh."""
+        return Downloader(self.server.url(name), os.path.join(self.cache, name), max_age=0)
+
+    def statuses(self):
+        """Status codes of the requests so far (and forgetting them)."""
+        statuses = [status for _, status, _ in self.server.requests]
+        self.server.requests.clear()
+        return statuses
+
+    def content(self, name, folder=None):
+        """Content of a file."""
+        with open(os.path.join(folder or self.cache, name), 'r') as stream:
+            return stream.read()
+
+    def test_revalidation(self):
+        """Unchanged content is answered with 304, changed content is downloaded again."""
+        for name in ['covid19.csv', 'covid19-germany.json']:
+            downloader = self.downloader(name)
+            self.assertTrue(downloader.refresh())
+            self.assertFalse(downloader.refresh())
+            self.assertEqual(self.statuses(), [200, 304])
+            self.assertEqual(self.content(name), self.content(name, self.source))
+
+        with open(os.path.join(self.source, 'covid19.csv'), 'a') as stream:
+            stream.write('29/03/2020,290,0,Germany\n')
+        self.assertTrue(self.downloader('covid19.csv').refresh())
+        self.assertEqual(self.statuses(), [200])
+        self.assertEqual(self.content('covid19.csv'), CSV + '29/03/2020,290,0,Germany\n')
+
+    def test_server_unreachable(self):
+        """An outdated cache file is used when the server can't be reached."""
+        downloader = self.downloader('covid19.csv')
+        self.assertTrue(downloader.refresh())
+        self.server.stop()
+
+        self.assertFalse(downloader.refresh())
+        self.assertEqual(self.content('covid19.csv'), CSV)
+        with self.assertRaises(requests.ConnectionError):
+            self.downloader('covid19-germany.json').refresh()
+
+    def test_fresh_cache_file(self):
+        """No request while the cache file is fresh."""
+        downloader = self.downloader('covid19.csv')
+        downloader.max_age = 3600
+        self.assertTrue(downloader.refresh())
+        self.assertFalse(downloader.refresh())
+        self.assertEqual(self.statuses(), [200])
+
+    def interrupt(self, name, size):
+        """Downloaded file replaced by a .part file with the first bytes of the content."""
+        downloader = self.downloader(name)
+        downloader.refresh()
+        metadata = downloader.load_metadata()
+        with open(downloader.path, 'rb') as stream:
+            content = stream.read()
+        with open(downloader.part_file, 'wb') as stream:
+            stream.write(content[:size])
+        os.remove(downloader.path)
+        downloader.save_metadata({'partial': {'etag': metadata['etag'],
+                                              'last_modified': metadata['last_modified']}})
+        self.statuses()
+        return downloader, content
+
+    def test_resume(self):
+        """A truncated .part file is completed with a range request."""
+        downloader, content = self.interrupt('covid19-germany.json', 1000)
+        self.assertTrue(downloader.refresh())
+
+        self.assertEqual(self.statuses(), [206])
+        self.assertFalse(os.path.isfile(downloader.part_file))
+        with open(downloader.path, 'rb') as stream:
+            self.assertEqual(stream.read(), content)
+
+    def test_resume_changed_content(self):
+        """The content is downloaded again when it has changed since the interruption."""
+        downloader, _ = self.interrupt('covid19.csv', 100)
+        with open(os.path.join(self.source, 'covid19.csv'), 'w') as stream:
+            stream.write(CSV.upper())
+
+        self.assertTrue(downloader.refresh())
+        self.assertEqual(self.statuses(), [200])
+        self.assertEqual(self.content('covid19.csv'), CSV.upper())
+
+    def test_invalid_range(self):
+        """A .part file longer than the content is dropped after 416 (full download)."""
+        downloader, content = self.interrupt('covid19.csv', len(CSV))
+        with open(downloader.part_file, 'ab') as stream:
+            stream.write(b'garbage')
+
+        self.assertTrue(downloader.refresh())
+        self.assertEqual(self.statuses(), [416, 200])
+        with open(downloader.path, 'rb') as stream:
+            self.assertEqual(stream.read(), content)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+"""Concurrent refresh of both cache files against a stand-in server with latency."""
+import os
+import json
+import time
+import shutil
+import logging
+import tempfile
+import threading
+import unittest
+
+from download import Downloader, refresh
+from fetch import Application
+from metadata import RegionMetadata
+from scripts import load_application
+from stand_in_server import StandInServer
+
+DELAY = 0.5
+CSV = 'dateRep,day,month,year,cases,deaths,countriesAndTerritories,geoId,' \
+    'countryterritoryCode,popData2019,continentExp\n' + ''.join(
+        '%02d/03/2020,%d,3,2020,%d,%d,%s,X,XXX,1000000,Europe\n' % (
+            day, day, day * 10, day, country)
+        for country in ['Germany', 'Italy'] for day in range(28, 0, -1))
+GEOJSON = json.dumps({'type': 'FeatureCollection', 'features': [
+    {'type': 'Feature', 'geometry': None, 'properties': {
+        'FID': index, 'Bundesland': ['Hessen', 'Baden-Württemberg'][index % 2],
+        'Landkreis': ['SK Darmstadt', 'LK Lörrach'][index % 2],
+        'AnzahlFall': 1 + index % 3, 'AnzahlTodesfall': index % 2,
+        'Meldedatum': '2020/11/%02d 00:00:00' % (1 + index % 19),
+        'Datenstand': '20.11.2020, 00:00 Uhr', 'NeuerFall': 0, 'NeuerTodesfall': 0}}
+    for index in range(200)]})
+
+
+class FetchTest(unittest.TestCase):
+    """Downloads of both datasets overlap; each file is parsed as soon as it arrives."""
+
+    def setUp(self):
+        """Source files served with a latency per request, empty cache directory."""
+        logging.disable(logging.INFO)
+        self.source = tempfile.mkdtemp()
+        self.cache = tempfile.mkdtemp()
+        for name, content in [('covid19.csv', CSV), ('covid19-germany.json', GEOJSON)]:
+            with open(os.path.join(self.source, name), 'w', encoding='utf-8') as stream:
+                stream.write(content)
+        self.server = StandInServer(self.source, delay=DELAY).start()
+
+    def tearDown(self):
+        """Stopping the server, removing the files."""
+        self.server.stop()
+        shutil.rmtree(self.source)
+        shutil.rmtree(self.cache)
+        logging.disable(logging.NOTSET)
+
+    def downloaders(self):
+        """Downloaders for both files which revalidate on each refresh."""
+        return [Downloader(self.server.url(name), os.path.join(self.cache, name), max_age=0)
+                for name in ['covid19.csv', 'covid19-germany.json']]
+
+    def test_refresh(self):
+        """Both downloads take the latency once; arrivals are reported in the calling thread."""
+        arrivals = []
+
+        def on_arrival(downloader, changed):
+            arrivals.append((os.path.basename(downloader.path), changed,
+                             threading.current_thread() is threading.main_thread()))
+
+        for changed in [True, False]:
+            downloaders = self.downloaders()
+            start = time.perf_counter()
+            self.assertEqual(len(refresh(downloaders, on_arrival)), 2 if changed else 0)
+            self.assertLess(time.perf_counter() - start, 1.8 * DELAY)
+            self.assertEqual(sorted(arrivals), [('covid19-germany.json', changed, True),
+                                                ('covid19.csv', changed, True)])
+            arrivals.clear()
+        self.assertEqual(sorted(status for _, status, _ in self.server.requests),
+                         [200, 200, 304, 304])
+
+    def test_fetch(self):
+        """fetch.py downloads both files and writes the binary caches and region names."""
+        paths = {name: os.path.join(self.cache, name)
+                 for name in ['covid19.csv', 'covid19-germany.json']}
+        options = {'dataset': 'all', 'data_url': self.server.url('covid19.csv'),
+                   'germany_data_url': self.server.url('covid19-germany.json'),
+                   'cache_file': paths['covid19.csv'],
+                   'germany_cache_file': paths['covid19-germany.json'], 'cache_max_age': 0}
+        start = time.perf_counter()
+        Application(options).run()
+        self.assertLess(time.perf_counter() - start, 1.8 * DELAY + 5.0)
+
+        for path in paths.values():
+            self.assertTrue(os.path.isfile(path + '.bin'))
+        names = RegionMetadata(paths['covid19.csv'] + '.meta.json', paths['covid19.csv']).read()
+        self.assertIn('germany', names['countriesAndTerritories'])
+        self.assertIn('italy', names['countriesAndTerritories'])
+        names = RegionMetadata(paths['covid19-germany.json'] + '.meta.json',
+                               paths['covid19-germany.json']).read()
+        self.assertEqual(names['bundesland'], ['baden-württemberg', 'hessen'])
+
+    def test_streamed_download(self):
+        """Without cache both tools parse the data while downloading them."""
+        for dataset, name in [('ecdc', 'covid19.csv'), ('rki', 'covid19-germany.json')]:
+            application = load_application(dataset, cache=False, data_url=self.server.url(name),
+                                           cache_file=os.path.join(self.cache, name))
+            application.fetch_data()
+            self.assertFalse(os.path.isfile(os.path.join(self.cache, name)))
+            if dataset == 'ecdc':
+                self.assertEqual(int(application.df['cases'].sum()), 2 * 10 * 28 * 29 // 2)
+            else:
+                self.assertEqual(int(application.df['cases'].sum()),
+                                 sum(1 + index % 3 for index in range(200)))
+                self.assertEqual(sorted(application.df['bundesland'].unique()),
+                                 ['Baden-Württemberg', 'Hessen'])
+
+
+if __name__ == '__main__':
+    unittest.main()
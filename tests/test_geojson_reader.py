@@ -0,0 +1,39 @@
+"""Streaming the features of a GeoJSON document."""
+import io
+import unittest
+
+from geojson_reader import FeatureReader
+
+NAMES = ['Baden-Württemberg %d' % index for index in range(50)]
+DOCUMENT = '{"type":"FeatureCollection","features":[\n%s\n]}' % ',\n'.join(
+    '{"type":"Feature","properties":{"Bundesland":"%s"}}' % name for name in NAMES)
+
+
+class FeatureReaderTest(unittest.TestCase):
+    """Features of binary and text streams for any chunk size."""
+
+    def names(self, stream, chunk_size):
+        """Bundesland of each feature."""
+        return [feature['properties']['Bundesland']
+                for feature in FeatureReader(stream, chunk_size=chunk_size)]
+
+    def test_chunks(self):
+        """Characters and features split between chunks are decoded."""
+        for chunk_size in [1, 3, 7, 64, 1024 * 1024]:
+            self.assertEqual(self.names(io.BytesIO(DOCUMENT.encode('utf-8')), chunk_size), NAMES)
+            self.assertEqual(self.names(io.StringIO(DOCUMENT), chunk_size), NAMES)
+
+    def test_stream_left_open(self):
+        """The caller closes the stream."""
+        stream = io.BytesIO(DOCUMENT.encode('utf-8'))
+        self.assertEqual(len(self.names(stream, 64)), len(NAMES))
+        self.assertFalse(stream.closed)
+
+    def test_truncated(self):
+        """A document ending within the features is an error."""
+        with self.assertRaises(ValueError):
+            self.names(io.BytesIO(DOCUMENT[:len(DOCUMENT) // 2].encode('utf-8')), 64)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+"""Ingesting consecutive RKI publications into the aggregated store."""
+import os
+import json
+import shutil
+import logging
+import tempfile
+import unittest
+import numpy as np
+
+from rki_store import RkiStore
+
+LANDKREISE = [('Hessen', 'SK Darmstadt'), ('Hessen', 'LK Offenbach'), ('Bayern', 'SK München')]
+
+
+def feature(index, day, landkreis, cases, deaths=0, flag=0, death_flag=0):
+    """Properties of one feature as in the RKI GeoJSON."""
+    bundesland, name = LANDKREISE[landkreis]
+    return {'FID': index, 'Bundesland': bundesland, 'Landkreis': name,
+            'Meldedatum': '2020/11/%02d 00:00:00' % day, 'AnzahlFall': cases,
+            'AnzahlTodesfall': deaths, 'NeuerFall': flag, 'NeuerTodesfall': death_flag}
+
+
+class RkiStoreTest(unittest.TestCase):
+    """Applying the changes of the next publication equals a full rebuild."""
+
+    def setUp(self):
+        """Empty folder for the publications and the stores."""
+        logging.disable(logging.INFO)
+        self.folder = tempfile.mkdtemp()
+        self.base = [feature(index, 1 + index % 10, index % 3, 1 + index % 4, index % 5 == 0)
+                     for index in range(300)]
+
+    def tearDown(self):
+        """Removing the files."""
+        shutil.rmtree(self.folder)
+        logging.disable(logging.NOTSET)
+
+    def publish(self, day, features):
+        """Writing a publication of given day (November 2020); returns its path."""
+        path = os.path.join(self.folder, 'covid19-germany.json')
+        with open(path, 'w', encoding='utf-8') as stream:
+            json.dump({'type': 'FeatureCollection', 'features': [
+                {'type': 'Feature', 'geometry': None,
+                 'properties': dict(properties, Datenstand='%02d.11.2020, 00:00 Uhr' % day)}
+                for properties in features]}, stream)
+        return path
+
+    def rebuild(self, path):
+        """Rows of a new store built from the publication only."""
+        return RkiStore(os.path.join(self.folder, 'rebuilt.bin'), path).load()
+
+    def assert_rows_equal(self, rows, expected):
+        """Same keys and counts."""
+        self.assertEqual(list(rows.columns), list(expected.columns))
+        for name in rows.columns:
+            self.assertEqual(list(rows[name]), list(expected[name]), name)
+
+    def next_publication(self):
+        """Features of the next day: some removed and revised, new ones on old and new days."""
+        removed = set(range(0, 300, 7))
+        features = [dict(properties, NeuerFall=0) for index, properties in enumerate(self.base)
+                    if index not in removed]
+        features.extend(dict(self.base[index], AnzahlFall=-self.base[index]['AnzahlFall'],
+                             AnzahlTodesfall=-self.base[index]['AnzahlTodesfall'],
+                             NeuerFall=-1, NeuerTodesfall=-1)
+                        for index in removed)
+        features.extend(feature(1000 + index, [3, 11, 12][index % 3], index % 3, 2, index % 2,
+                                flag=1, death_flag=1 if index % 2 else -9)
+                        for index in range(30))
+        return features
+
+    def test_delta(self):
+        """Changes since the previous day are merged into the stored rows."""
+        store = RkiStore(os.path.join(self.folder, 'store.bin'), self.publish(20, self.base))
+        initial = store.load()
+        self.assertEqual(int(initial['cases'].sum()), sum(f['AnzahlFall'] for f in self.base))
+
+        path = self.publish(21, self.next_publication())
+        self.assertEqual(store.cache.read_header()['metadata']['watermark'], '2020-11-20')
+        rows = store.load()
+        self.assertEqual(store.cache.read_header()['metadata']['watermark'], '2020-11-21')
+        self.assert_rows_equal(rows, self.rebuild(path))
+        self.assertIn(np.datetime64('2020-11-12'), rows['date'].values.astype('datetime64[D]'))
+
+    def test_same_publication(self):
+        """A touched file of the ingested publication keeps the rows (mapped while written)."""
+        path = self.publish(20, self.base)
+        store = RkiStore(os.path.join(self.folder, 'store.bin'), path)
+        rows = store.load()
+        mapped = store.cache.data_file()
+        status = os.stat(path)
+        os.utime(path, ns=(status.st_atime_ns, status.st_mtime_ns + 10 ** 9))
+        self.assert_rows_equal(store.load(), rows)
+        self.assertTrue(store.cache.is_valid())
+        # written to a new data file; the mapped one is left alone
+        self.assertNotEqual(store.cache.data_file(), mapped)
+        self.assertTrue(os.path.isfile(mapped))
+
+    def test_gap(self):
+        """A publication not following the watermark is rebuilt completely."""
+        store = RkiStore(os.path.join(self.folder, 'store.bin'), self.publish(20, self.base))
+        store.load()
+        features = [dict(properties, NeuerFall=0) for properties in self.next_publication()
+                    if properties['NeuerFall'] >= 0]
+        path = self.publish(22, features)
+        self.assert_rows_equal(store.load(), self.rebuild(path))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,140 @@
+"""Trend lines and rolling averages for many regions at once."""
+# Copyright (c) 2020 Thomas Lehmann
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons
+# to whom the Software is furnished to do so, subject to the following conditions:
+# The above copyright notice and this permission notice shall be included in all copies
+# or substantial portions of the Software.
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import collections
+import numpy as np
+
+
+class TrendEngine:
+    """Polynomial trend and rolling averages of per day series, cached per data version.
+
+    All series of the same length are stacked as columns of one matrix and
+    fitted together: the least squares fit of degree 5 is the projection onto
+    the column space of the Vandermonde matrix, computed with its orthonormal
+    basis (QR) on days scaled to [-1, 1]. The basis is computed once per
+    length. Rolling averages are differences of cumulative sums. Undefined
+    days (NaN) of a series are left out of its fit and its averages.
+
+    At most MAX_CURVES curves and MAX_BASES bases are kept (least recently
+    used ones are dropped), since a long running server sees a new key for
+    each number of visible days.
+    """
+
+    DEGREE = 5
+    WINDOWS = [7, 14]
+    MAX_CURVES = 4096
+    MAX_BASES = 64
+
+    def __init__(self, windows=None):
+        """Initialize engine computing the rolling averages for given windows (days)."""
+        self.windows = sorted(set(TrendEngine.WINDOWS + list(windows or [])))
+        self.version = None
+        self.bases = collections.OrderedDict()
+        self.curves = collections.OrderedDict()
+
+    def update(self, version):
+        """Forgetting the curves when the data have changed."""
+        if version != self.version:
+            self.version = version
+            self.curves.clear()
+
+    def basis(self, length):
+        """Orthonormal basis of the Vandermonde matrix for series of given length."""
+        if length in self.bases:
+            self.bases.move_to_end(length)
+        else:
+            x = np.linspace(-1.0, 1.0, length)
+            vandermonde = np.vander(x, TrendEngine.DEGREE + 1)
+            self.bases[length] = np.linalg.qr(vandermonde)[0]
+            if len(self.bases) > TrendEngine.MAX_BASES:
+                self.bases.popitem(last=False)
+        return self.bases[length]
+
+    @staticmethod
+    def rolling_mean(values, window):
+        """Mean of the last window days for each day (and column); fewer days at the start.
+
+        Undefined days (NaN, like the first days of a doubling time) are left
+        out of the means and stay undefined.
+        """
+        finite = np.isfinite(values)
+        totals = np.cumsum(np.vstack([np.zeros((1, values.shape[1])),
+                                      np.where(finite, values, 0.0)]), axis=0)
+        counts = np.cumsum(np.vstack([np.zeros((1, values.shape[1]), dtype=np.int64),
+                                      finite]), axis=0)
+        days = np.arange(1, len(values) + 1)
+        start = np.maximum(days - window, 0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = (totals[days] - totals[start]) / (counts[days] - counts[start])
+        return np.where(finite, means, np.nan)
+
+    def project(self, values):
+        """Least squares fit of each column; undefined days (NaN) are left out of the fit.
+
+        Complete columns are fitted together with the orthonormal basis, the
+        others one by one on their finite days. The trend is undefined (NaN)
+        where the values are.
+        """
+        basis = self.basis(len(values))
+        finite = np.isfinite(values)
+        if finite.all():
+            return basis.dot(basis.T.dot(values))
+
+        trend = np.full(values.shape, np.nan)
+        complete = finite.all(axis=0)
+        trend[:, complete] = basis.dot(basis.T.dot(values[:, complete]))
+        for column in np.flatnonzero(~complete & finite.any(axis=0)):
+            days = finite[:, column]
+            coefficients = np.linalg.lstsq(basis[days], values[days, column], rcond=None)[0]
+            trend[days, column] = basis[days].dot(coefficients)
+        return trend
+
+    def compute(self, series):
+        """Computing the curves of all series (dictionary by key) not known yet."""
+        missing = {}
+        for key, values in series.items():
+            if key not in self.curves:
+                missing.setdefault(len(values), []).append(key)
+
+        for length, keys in missing.items():
+            values = np.column_stack([np.asarray(series[key], dtype=np.float64)
+                                      for key in keys]).reshape(length, len(keys))
+            if length:
+                curves = {'trend': self.project(values)}
+                curves.update({window: TrendEngine.rolling_mean(values, window)
+                               for window in self.windows})
+            else:
+                curves = {name: values for name in ['trend'] + self.windows}
+            for column, key in enumerate(keys):
+                self.curves[key] = {name: curve[:, column] for name, curve in curves.items()}
+        while len(self.curves) > TrendEngine.MAX_CURVES:
+            self.curves.popitem(last=False)
+
+    def fit(self, values):
+        """Polynomial trend of one series (not kept; for series used once)."""
+        values = np.asarray(values, dtype=np.float64)
+        if not len(values):
+            return values
+        return self.project(values.reshape(-1, 1))[:, 0]
+
+    def lookup(self, key, values):
+        """Curves ('trend' and one per window) of one series (computed when not known yet)."""
+        if key in self.curves:
+            self.curves.move_to_end(key)
+        else:
+            self.compute({key: values})
+        return self.curves[key]
@@ -16,26 +16,51 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.import os
 import sys
 import os
+import json
 import platform
 import logging
-import json
-import requests
+import collections
+import multiprocessing
 import click
 import numpy as np
-import pandas as pd
 from datetime import datetime
 
-import matplotlib.pyplot as plt
+from decimate import Decimation
+from metadata import RegionMetadata
+from profiling import Profiler
+from manifest import RenderManifest
+from render import NoDataError, Renderer
+from series_export import SeriesExport
+from trend import TrendEngine
+from rollup import RollupCube
+
+# pandas, matplotlib and requests are imported where needed: listing the
+# regions (see --list-regions) must not pay for importing them
+
+# application of a worker process (see --jobs)
+WORKER = None
 
 
 class Application:
     """Application for visualizing Corona data."""
 
     DATA_URL = 'https://opendata.arcgis.com/datasets/dd4580c810204019a7b8eb3e0b329dd6_0.geojson'
+    PROFILE_FILE = 'visualize-germany-profile.json'
+    MANIFEST_FILE = 'covid19-germany-manifest.json'
+    # options changing the images (see exports)
+    RENDER_OPTIONS = ['data_url', 'filter_by', 'width', 'height', 'initial_cases',
+                      'average', 'decimate']
 
     def __init__(self, options):
         """Initialize application with command line options."""
         self.options = options
+        self.df = None
+        self.cube = None
+        self.template = None
+        self.trends = TrendEngine([options['average']] if options['average'] else [])
+        self.version = None
+        self.profiler = Profiler(options['profile'], options['profile_hot_region'])
+        self.manifest = RenderManifest(Application.MANIFEST_FILE) if options['manifest'] else None
 
     @staticmethod
     def initialize_logging():
@@ -53,94 +78,110 @@ class Application:
 
     def log_options(self):
         """Logging of the options."""
+        logging.info("data url: %(data_url)s", self.options)
         logging.info("use cache: %(cache)s", self.options)
         logging.info("cache file: %(cache_file)s", self.options)
+        logging.info("cache max age: %(cache_max_age)d seconds", self.options)
+        logging.info("binary cache file: %s", self.binary_cache_file())
+        logging.info("jobs: %(jobs)d", self.options)
+        logging.info("profile: %(profile)s", self.options)
+        logging.info("average: %(average)d", self.options)
+        logging.info("manifest: %(manifest)s", self.options)
+        logging.info("decimate: %(decimate)s", self.options)
+        logging.info("export: %(export)s", self.options)
+        logging.info("atlas: %(atlas)s (%(atlas_columns)dx%(atlas_rows)d, %(atlas_metric)s)",
+                     self.options)
 
     @staticmethod
-    def create_df_from_json(content):
-        data = {
-            'date': [],
-            'bundesland': [],
-            'landkreis': [],
-            'cases': [],
-            'deaths': []
-        }
-
-        tree = json.loads(content)
-        for entry in tree['features']:
-            data['bundesland'].append(entry['properties']['Bundesland'])
-            data['landkreis'].append(entry['properties']['Landkreis'])
-            data['cases'].append(entry['properties']['AnzahlFall'])
-            data['deaths'].append(entry['properties']['AnzahlTodesfall'])
-            date = datetime.strptime(entry['properties']['Meldedatum'], "%Y/%m/%d %H:%M:%S")
-            data['date'].append(date)
-
-        return pd.DataFrame(data)
+    def create_df_from_json(stream):
+        """Streaming the GeoJSON features into typed columns."""
+        from geojson_reader import RkiColumns
+        return RkiColumns.read(stream)
+
+    def binary_cache_file(self):
+        """Path and filename of the aggregated binary cache (next to the cache file)."""
+        return self.options['cache_file'] + '.bin'
+
+    def downloader(self):
+        """Downloader keeping the cache file up to date."""
+        from download import Downloader
+        return Downloader(self.options['data_url'], self.options['cache_file'],
+                          self.options['cache_max_age'])
+
+    def read_cache(self):
+        """Reading the data of the cache file (from the aggregated store when possible)."""
+        from rki_store import RkiStore
+        # aggregated data, updated with the changes of a new publication only
+        store = RkiStore(self.binary_cache_file(), self.options['cache_file'])
+        with self.profiler.stage('parse'):
+            self.df = store.load()
+        self.version = json.dumps(store.cache.source_signature(), sort_keys=True)
 
     def fetch_data(self):
+        from download import Downloader, refresh
+        from rki_store import RkiStore
         if self.options['cache']:
-            if not os.path.isfile(self.options['cache_file']):
-                logging.info("Downloading from %s", Application.DATA_URL)
-                response = requests.get(Application.DATA_URL)
-                with open(self.options['cache_file'], 'wb') as stream:
-                    stream.write(response.content)
-
-            with open(self.options['cache_file'], 'rb') as stream:
-                self.df = Application.create_df_from_json(stream.read())
+            with self.profiler.stage('fetch'):
+                refresh([self.downloader()])
+            self.read_cache()
+        else:
+            with self.profiler.stage('fetch'):
+                response = Downloader.open(self.options['data_url'])
+            self.version = datetime.now().isoformat()
+            # the content is downloaded while parsing
+            with response, self.profiler.stage('parse', detail='streamed download'):
+                self.df = RkiStore.aggregate(Application.create_df_from_json(response.raw))
+
+    def build_cube(self):
+        """Cases and deaths per day for each Landkreis, Bundesland and Germany (once)."""
+        self.cube = RollupCube(self.df)
+        self.trends.update(self.version)
+
+    def region_metadata(self):
+        """Bundesland and Landkreis names of the cache file (next to the cache file)."""
+        return RegionMetadata(self.options['cache_file'] + '.meta.json', self.options['cache_file'])
+
+    def load_data(self, download=True):
+        """Fetching the data (or reading the cache file only) and summing them up per region."""
+        if download:
+            self.fetch_data()
         else:
-            logging.info("Downloading from %s", Application.DATA_URL)
-            response = requests.get(Application.DATA_URL)
-            self.df = Application.create_df_from_json(response.content.decode())
+            self.read_cache()
+        with self.profiler.stage('index'):
+            self.build_cube()
+
+        # data of the cache file: keeping the names for --list-regions
+        if (self.options['cache'] or not download) and self.region_metadata().read() is None:
+            self.region_metadata().write({level: self.cube.names(level)
+                                          for level in RollupCube.LEVELS})
+
+    def list_regions(self):
+        """Printing the names of the filter level (loading the data only when outdated)."""
+        regions = self.region_metadata().read()
+        if regions is None:
+            self.load_data(download=not os.path.isfile(self.options['cache_file']))
+            regions = {level: self.cube.names(level) for level in RollupCube.LEVELS}
+        for name in regions[self.options['filter_by']]:
+            click.echo(name)
+
+    def contains(self, final_filter):
+        """True when data exist for the filter value ('all' always exists)."""
+        return final_filter == 'all' or self.cube.contains(self.options['filter_by'], final_filter)
+
+    def validate(self, final_filter):
+        """Searching for the Bundesland or Landkreis of the filter (exit when not found)."""
+        if not self.contains(final_filter):
+            logging.error("%s '%s' not found!", self.options['filter_by'].title(), final_filter)
+            sys.exit(1)
 
     def provide_concrete_data(self, final_filter):
-        # searching for the country defined in the options
-        if not final_filter == 'all':
-            if not any(self.df[self.options['filter_by']].str.lower().eq(
-                       final_filter).values.flatten()):
-                logging.error("%s '%s' not found!", self.options['filter_by'].title(), final_filter)
-                sys.exit(1)
-
-        if final_filter == 'all':
-            temp = self.df.groupby(['date']).agg({
-                'date': ['min'],
-                'bundesland': ['min'], 'landkreis': ['min'],
-                'cases': ['sum'], 'deaths': ['sum']
-            })
-            temp.columns = ['date', 'bundesland', 'landkreis', 'cases', 'deaths']
-
-            data = {
-                'date': temp['date'].values.flatten(),
-                'bundlesland': temp['bundesland'].values.flatten(),
-                'landkreis': temp['landkreis'].values.flatten(),
-                'cases': temp['cases'].values.flatten(),
-                'deaths': temp['deaths'].values.flatten(),
-            }
-        else:
-            temp = self.df.groupby(['date', self.options['filter_by']]).agg({
-                'date': ['min'],
-                'bundesland': ['min'], 'landkreis': ['min'],
-                'cases': ['sum'], 'deaths': ['sum']
-            })
-            temp.columns = ['date', 'bundesland', 'landkreis', 'cases', 'deaths']
-
-            data = {
-                'date': temp['date'].values.flatten(),
-                'bundesland': temp['bundesland'].values.flatten(),
-                'landkreis': temp['landkreis'].values.flatten(),
-                'cases': temp['cases'].values.flatten(),
-                'deaths': temp['deaths'].values.flatten(),
-            }
-
-        df_concrete = pd.DataFrame(data)
-
-        if not final_filter == 'all':
-            # filter for concrete country
-            df_concrete = df_concrete[
-                df_concrete[self.options['filter_by']].str.lower().eq(final_filter)]
-
-        # sort by date ascending
-        df_concrete = df_concrete.sort_values(by=['date'])
-        df_concrete = df_concrete.reset_index(drop=True)
+        import pandas as pd
+        self.validate(final_filter)
+
+        # sum of cases and deaths per day (sorted by date ascending)
+        dates, values = self.cube.series(self.options['filter_by'], final_filter)
+        df_concrete = pd.DataFrame({'date': dates.astype('datetime64[ns]'),
+                                    'cases': values['cases'], 'deaths': values['deaths']})
 
         # some information required for all graphs
         first_day = df_concrete['date'].values.flatten()[0]
@@ -149,18 +190,32 @@ class Application:
 
         # allow to filter out rare cases at the beginning (default: take all)
         # that's for visualizing in the graphs only
-        first_value_index = df_concrete.query(
-            'cases >= %d' % self.options['initial_cases']).index[0]
-        df_concrete = df_concrete.iloc[first_value_index:]
+        shown = df_concrete.query('cases >= %d' % self.options['initial_cases']).index
+        if not len(shown):
+            raise NoDataError("No day of '%s' with at least %d cases"
+                              % (final_filter, self.options['initial_cases']))
+        df_concrete = df_concrete.iloc[shown[0]:]
 
         return df_concrete, first_day, sum_of_cases, sum_of_deaths
 
+    def trend_key(self, filter_value, name):
+        """Key of the curves of one filter value and metric (depends on the visible days)."""
+        return self.options['filter_by'], filter_value, name, self.options['initial_cases']
+
+    def compute_trends(self, data):
+        """Fitting the trends of all filter values (dictionary of concrete data) in one go."""
+        self.trends.compute({
+            self.trend_key(filter_value, name): df_concrete[name].values
+            for filter_value, (df_concrete, _, _, _) in data.items()
+            for name in ['cases', 'deaths']})
+
     def configure_subplots(self):
         """Define layout, main title and resolution of image."""
+        import matplotlib.pyplot as plt
         fig, main_axes = plt.subplots(nrows=2, ncols=1, sharex=True)
 
         current_date = datetime.now().date().isoformat()
-        fig.suptitle(Application.DATA_URL + ' (' + current_date + ')', fontsize=8)
+        fig.suptitle(self.options['data_url'] + ' (' + current_date + ')', fontsize=8)
 
         # adjusting figure to show in requested resolution (default: 1024x768 pixel)
         DPI = fig.get_dpi()
@@ -175,16 +230,29 @@ class Application:
         title = 'Corona %s In %s (Total since %s: %d)' % \
             (name.title(), country.title(), first_day_str, total)
 
-        # plot of the concrete data
+        # polynomial fit (and rolling average) computed for all regions before
         x = df_concrete['date'].values.flatten()
-        target.plot(x, df_concrete[name].values.flatten(),
-                    label=name, color='#008000')
+        values = df_concrete[name].values.flatten()
+        curves = self.trends.lookup(self.trend_key(country_filter, name), values)
+        average = curves[self.options['average']] if self.options['average'] else None
+
+        # points the width of the axes can show (all without decimation)
+        keep = Decimation.indices(self.options['decimate'], values, int(target.bbox.width))
+        x, values, trend = x[keep], values[keep], curves['trend'][keep]
+        average = average[keep] if average is not None else None
 
-        # square polynomial fit for Corona cases
-        xt = np.arange(len(x))
-        pt = np.poly1d(np.polyfit(xt, df_concrete[name].values.flatten(), 5))
-        target.plot(x, pt(xt), label='squares polynomial fit',
+        if target.lines:
+            # axes of the reused figure
+            Renderer.update(target, x, values, trend, title, average)
+            return
+
+        # plot of the concrete data
+        target.plot(x, values, label=name, color='#008000')
+        target.plot(x, trend, label='squares polynomial fit',
                     linestyle='dashed', linewidth=0.75, color='#800000')
+        if average is not None:
+            target.plot(x, average, label='%d-day average' % self.options['average'],
+                        linewidth=1.0, color='#000080')
 
         target.set_title(title)
         target.set_xlabel('Date')
@@ -193,42 +261,224 @@ class Application:
         target.grid(alpha=0.5)
         target.legend(loc='upper left')
 
-    def visualize(self, filter_value, data):
-        """Plotting the data."""
+    def exports(self, filter_value, data):
+        """Files to export as (format, filename, digest of input); unchanged ones are left out."""
+        df_concrete, first_day, sum_of_cases, sum_of_deaths = data
+        digest = RenderManifest.digest(
+            filter_value, str(first_day), int(sum_of_cases), int(sum_of_deaths),
+            df_concrete['date'].values, df_concrete['cases'].values, df_concrete['deaths'].values,
+            TrendEngine.DEGREE, *[self.options[name] for name in Application.RENDER_OPTIONS])
+        exports = [(format, filename, RenderManifest.digest(digest, format))
+                   for format, filename in zip(self.options['format'],
+                                               self.filenames(filter_value))]
+        if self.manifest is None:
+            return exports
+        return [entry for entry in exports if not self.manifest.is_current(*entry[1:])]
+
+    def visualize(self, filter_value, data, exports=None):
+        """Plotting the data (exporting the out-of-date images unless exports are given)."""
         df_concrete, first_day, sum_of_cases, sum_of_deaths = data
-        fig, main_axes = self.configure_subplots()
+        if exports is None:
+            exports = self.exports(filter_value, data)
+        if self.options['format'] and not exports:
+            logging.info("Images of %s are unchanged", filter_value)
+            return None
+
+        if self.template is None:
+            fig, main_axes = self.configure_subplots()
+        else:
+            fig, main_axes = self.template
 
         # ensure that no negative axis is shown
         main_axes[0].set_ylim(0, df_concrete['cases'].max())
         main_axes[1].set_ylim(0, df_concrete['deaths'].max())
 
-        self.plot(main_axes[0], 'cases', sum_of_cases, filter_value, df_concrete, first_day)
-        self.plot(main_axes[1], 'deaths', sum_of_deaths, filter_value, df_concrete, first_day)
+        with self.profiler.stage('plot', filter_value, 'cases'):
+            self.plot(main_axes[0], 'cases', sum_of_cases, filter_value, df_concrete, first_day)
+        with self.profiler.stage('plot', filter_value, 'deaths'):
+            self.plot(main_axes[1], 'deaths', sum_of_deaths, filter_value, df_concrete, first_day)
 
         # export by given format
-        for format in self.options['format']:
-            filename = 'covid19-germany-%s.%s' % (filter_value, format)
-            filename = filename.replace(' ', '-')
+        for _, filename, _ in exports:
             logging.info("Generating %s" % filename)
-            plt.savefig(filename, format=format)
-
+        Renderer.export(fig, [(format, filename) for format, filename, _ in exports],
+                        self.profiler, filter_value)
+        if self.manifest:
+            for _, filename, digest in exports:
+                self.manifest.record(filename, digest)
+
+        # same figure for next filter value (memory does not grow with the number of them)
+        self.template = fig, main_axes
         return fig
 
+    def filenames(self, filter_value):
+        """Filenames of the images for given filter value (one per format)."""
+        return [('covid19-germany-%s.%s' % (filter_value, format)).replace(' ', '-')
+                for format in self.options['format']]
+
+    def render_parallel(self, filter_values):
+        """Rendering and exporting the filter values with a pool of processes."""
+        for filter_value in filter_values:
+            self.validate(filter_value)
+
+        # the cube is inherited (fork) or transferred once per process - not per filter value
+        with multiprocessing.Pool(self.options['jobs'], initializer=initialize_worker,
+                                  initargs=(self.options, self.cube)) as pool:
+            # results in order of the filter values for deterministic logging
+            for value, exports in zip(filter_values, pool.imap(render_region, filter_values)):
+                if not exports:
+                    logging.info("Images of %s are unchanged", value)
+                for _, filename, digest in exports:
+                    logging.info("Generating %s" % filename)
+                    if self.manifest:
+                        self.manifest.record(filename, digest)
+
+    def filter_values(self):
+        """Lowercase filter values of the options ('*' for all of the filter level)."""
+        filter_values = []
+        for filter_value in self.options['filter']:
+            filter_values.extend(self.cube.names(self.options['filter_by'])
+                                 if filter_value == '*' else [filter_value.lower()])
+        return filter_values
+
+    def series(self, filter_values):
+        """Per day series, totals and trend lines of the filter values (one after the other)."""
+        for filter_value in filter_values:
+            df_concrete, first_day, sum_of_cases, sum_of_deaths = \
+                self.provide_concrete_data(filter_value)
+            arrays = collections.OrderedDict(
+                [('date', df_concrete['date'].values.astype('datetime64[D]'))])
+            for name in ['cases', 'deaths']:
+                arrays[name] = df_concrete[name].values
+                arrays[name + '_trend'] = self.trends.fit(arrays[name])
+            info = {'first_day': np.datetime_as_string(first_day, unit='D'),
+                    'days': len(df_concrete), 'total_cases': int(sum_of_cases),
+                    'total_deaths': int(sum_of_deaths)}
+            yield filter_value, info, arrays
+
+    def export_series(self, filter_values):
+        """Writing the series of the filter values as data file with JSON index (no images)."""
+        if not SeriesExport.is_available(self.options['export']):
+            logging.error("Export as %s requires pyarrow!", self.options['export'])
+            sys.exit(1)
+        for filter_value in filter_values:
+            self.validate(filter_value)
+
+        export = SeriesExport('covid19-germany-%s-series' % self.options['filter_by'],
+                              self.options['export'])
+        for filename in export.filenames():
+            logging.info("Generating %s" % filename)
+        metadata = {'data_url': self.options['data_url'], 'version': self.version,
+                    'level': self.options['filter_by'],
+                    'created': datetime.now().isoformat(),
+                    'initial_cases': self.options['initial_cases'],
+                    'trend_degree': TrendEngine.DEGREE}
+        with self.profiler.stage('export', detail='%d filter values' % len(filter_values)):
+            export.write(self.series(filter_values), metadata)
+
+    def render_atlas(self, filter_values):
+        """Rendering the filter values as small multiples on the pages of an atlas."""
+        from atlas import Atlas
+        data = {filter_value: self.provide_concrete_data(filter_value)
+                for filter_value in filter_values}
+        self.compute_trends(data)
+
+        metric = self.options['atlas_metric']
+        atlas = Atlas(self.options['atlas_columns'], self.options['atlas_rows'],
+                      self.options['width'], self.options['height'])
+        pages = atlas.pages(list(data))
+        for page, page_values in enumerate(pages, 1):
+            series = []
+            for filter_value in page_values:
+                df_concrete = data[filter_value][0]
+                values = df_concrete[metric].values
+                trend = self.trends.lookup(self.trend_key(filter_value, metric), values)['trend']
+                name = filter_value if not filter_value == 'all' else 'All Countries'
+                series.append((name.title(), df_concrete['date'].values, values, trend))
+
+            title = 'Corona %s Per Day (%s, %s, page %d of %d)' % (
+                metric.title(), self.options['data_url'], datetime.now().date().isoformat(),
+                page, len(pages))
+            exports = [(format, 'covid19-germany-atlas-%s-%s-%d.%s' % (
+                self.options['filter_by'], metric, page, format))
+                for format in self.options['format']]
+            with self.profiler.stage('atlas', detail='page %d' % page):
+                atlas.render(title, series, exports)
+
+    def finish(self):
+        """Writing profile and manifest."""
+        self.profiler.write(Application.PROFILE_FILE)
+        if self.manifest:
+            self.manifest.save()
+
     def run(self):
         """Running the application logic."""
         Application.initialize_logging()
 
         self.log_options()
-        self.fetch_data()
-
-        for filter_value in self.options['filter']:
-            data = self.provide_concrete_data(filter_value.lower())
-            self.visualize(filter_value.lower(), data)
+        self.load_data()
+
+        if not self.options['export'] == 'none':
+            self.export_series(self.filter_values())
+            self.finish()
+            return
+
+        if self.options['atlas']:
+            self.render_atlas(self.filter_values())
+            self.finish()
+            return
+
+        if self.options['jobs'] > 1:
+            # stages of the worker processes are not recorded
+            with self.profiler.stage('render_parallel'):
+                self.render_parallel(self.filter_values())
+            self.finish()
+            return
+
+        filter_values = self.filter_values()
+        data = {}
+        for filter_value in filter_values:
+            with self.profiler.stage('provide_concrete_data', filter_value):
+                data[filter_value] = self.provide_concrete_data(filter_value)
+        with self.profiler.stage('trend', detail='%d filter values' % len(data)):
+            self.compute_trends(data)
+
+        for filter_value in filter_values:
+            with self.profiler.region(filter_value):
+                self.visualize(filter_value, data[filter_value])
+
+        self.finish()
+
+
+def initialize_worker(options, cube):
+    """Initializing a worker process with the (read-only) rollup cube."""
+    global WORKER  # pylint: disable=global-statement
+    import matplotlib
+    matplotlib.use('Agg')
+    # the main process is logging in order of the filter values
+    logging.getLogger().setLevel(logging.WARNING)
+    # the manifest of the last run tells the out-of-date images (it is saved by the main process)
+    WORKER = Application(dict(options, profile=False))
+    WORKER.cube = cube
+
+
+def render_region(filter_value):
+    """Rendering the out-of-date images of one filter value in a worker process."""
+    data = WORKER.provide_concrete_data(filter_value)
+    exports = WORKER.exports(filter_value, data)
+    if exports:
+        WORKER.visualize(filter_value, data, exports=exports)
+    return exports
 
 
 @click.command()
+@click.option('--data-url', default=Application.DATA_URL, type=str, show_default=True,
+              metavar="<URL>", help="URL of the data.")
 @click.option('--cache/--no-cache', default=False, show_default=True,
               help="Enable/Diable the cache.")
+@click.option('--cache-max-age', default=3600, type=click.IntRange(0, None), show_default=True,
+              metavar="<SECONDS>",
+              help="Seconds the cache file is used before checking for new data.")
 @click.option('--cache-file', default=os.path.join(os.getcwd(), 'covid19-germany.json'),
               type=str, show_default=True, metavar="<PATH>",
               help="Path and filename of the cache file.")
@@ -249,8 +499,42 @@ class Application:
 @click.option('--format', '-f', default=['png'], type=click.Choice(['png', 'svg', 'jpg']),
               show_default=True, multiple=True,
               help="File format for image (repeatable).")
+@click.option('--average', default=0, type=click.IntRange(0, 365), show_default=True,
+              metavar="<DAYS>", help="Plotting the rolling average of given days (0: none).")
+@click.option('--decimate', default='none', type=click.Choice(Decimation.METHODS),
+              show_default=True,
+              help="Reducing long series to the points the image width can show.")
+@click.option('--export', default='none',
+              type=click.Choice(['none'] + SeriesExport.FORMATS), show_default=True,
+              help="Writing the series of the filter values to "
+                   "covid19-germany-<filter-by>-series.<format> with JSON index instead of "
+                   "images (parquet requires pyarrow).")
+@click.option('--atlas/--no-atlas', default=False, show_default=True,
+              help="All filter values as small multiples on pages of an atlas.")
+@click.option('--atlas-columns', default=4, type=click.IntRange(1, None), show_default=True,
+              help="Number of columns of an atlas page.")
+@click.option('--atlas-rows', default=4, type=click.IntRange(1, None), show_default=True,
+              help="Number of rows of an atlas page.")
+@click.option('--atlas-metric', default='cases', type=click.Choice(['cases', 'deaths']),
+              show_default=True, help="Data shown by the atlas.")
+@click.option('--manifest/--no-manifest', default=True, show_default=True,
+              help="Skipping images whose data and options are unchanged "
+                   "(covid19-germany-manifest.json).")
+@click.option('--profile/--no-profile', default=False, show_default=True,
+              help="Write time and memory of each stage to visualize-germany-profile.json.")
+@click.option('--profile-hot-region/--no-profile-hot-region', default=False, show_default=True,
+              help="With --profile: cProfile data of the slowest filter value.")
+@click.option('--jobs', '-j', default=1, type=click.IntRange(1, None), show_default=True,
+              help="Number of processes rendering the filter values.")
+@click.option('--list-regions', is_flag=True, default=False,
+              help="Print the names of the --filter-by level of the cache file and exit.")
 def main(**options):
     """Visualizing covid19 data with matplotlib, panda and numpy."""
+    if options['list_regions']:
+        # names only (no logging)
+        Application(dict(options, manifest=False)).list_regions()
+        return
+
     application = Application(options)
     application.run()
 
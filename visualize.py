@@ -17,50 +17,93 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.import os
 import sys
 import os
+import json
 import platform
 import logging
-import requests
+import collections
+import multiprocessing
+import concurrent.futures
 import click
 import numpy as np
-import pandas as pd
-from io import StringIO
 from datetime import datetime
 
-import matplotlib
-import matplotlib.pyplot as plt
+from decimate import Decimation
+from metadata import RegionMetadata
+from metrics import MetricsEngine
+from profiling import Profiler, frame_memory, raw_frame_memory
+from manifest import RenderManifest
+from render import NoDataError, Renderer
+from series_export import SeriesExport
+from trend import TrendEngine
+from region_index import RegionIndex
 
-import tkinter as tk
-from tkinter import ttk
+# pandas, matplotlib, tkinter and requests are imported where needed: listing
+# the countries (see --list-countries) must not pay for importing them
+
+# application of a worker process (see --jobs)
+WORKER = None
 
 
 class Application:
     """Application for visualizing Corona data."""
 
     DATA_URL = "https://opendata.ecdc.europa.eu/covid19/casedistribution/csv"
+    COLUMNS = ['dateRep', 'cases', 'deaths', 'countriesAndTerritories', 'popData2019',
+               'continentExp']
+    PROFILE_FILE = 'visualize-profile.json'
+    MANIFEST_FILE = 'covid19-manifest.json'
+    # options changing the images (see exports)
+    RENDER_OPTIONS = ['data_url', 'width', 'height', 'initial_cases',
+                      'average', 'decimate', 'metric', 'metric_window']
 
     def __init__(self, options):
         """Initialize application with command line options."""
         self.options = options
         self.df = None
-        self.figures = []
+        self.index = None
+        self.pages = collections.OrderedDict()
+        self.slices = {}
+        self.template = None
+        self.trends = TrendEngine([options['average']] if options['average'] else [])
+        self.metrics = MetricsEngine()
+        self.version = None
+        self.profiler = Profiler(options['profile'], options['profile_hot_region'])
+        self.manifest = RenderManifest(Application.MANIFEST_FILE) if options['manifest'] else None
         self.root = None
         self.notebook = None
         self.page_class = None
 
         if self.options['viewer']:
+            import tkinter as tk
+            from tkinter import ttk
+            import matplotlib
             matplotlib.use("TkAgg")
+            import matplotlib.pyplot as plt
             from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 
             class Page(tk.Frame):
-                """Each page displays one country."""
+                """Each page displays one country (the figure exists while the page is live)."""
 
-                def __init__(self, parent, figure):
-                    """Initialize page."""
+                def __init__(self, parent, country):
+                    """Initialize page (empty until shown)."""
                     super(Page, self).__init__(parent)
+                    self.country = country
+                    self.figure = None
+                    self.figure_canvas_agg = None
+
+                def show(self, figure):
+                    """Displaying the figure."""
+                    self.figure = figure
                     self.figure_canvas_agg = FigureCanvasTkAgg(figure, master=self)
                     self.figure_canvas_agg.get_tk_widget().pack(fill=tk.BOTH, expand=tk.YES)
                     self.figure_canvas_agg.draw()
 
+                def release(self):
+                    """Removing canvas and figure (shown again when selected)."""
+                    self.figure_canvas_agg.get_tk_widget().destroy()
+                    plt.close(self.figure)
+                    self.figure, self.figure_canvas_agg = None, None
+
             self.page_class = Page
 
             self.root = tk.Tk()
@@ -70,13 +113,29 @@ class Application:
             self.root.protocol("WM_DELETE_WINDOW", self.on_destroy)
             self.notebook = ttk.Notebook(self.root)
             self.notebook.pack(fill=tk.BOTH, expand=tk.YES)
+            self.notebook.bind('<<NotebookTabChanged>>', self.on_tab_changed)
 
     def on_destroy(self):
         """Closing the application but before closing the figures."""
-        for figure in self.figures:
-            plt.close(figure)
+        import matplotlib.pyplot as plt
+        plt.close('all')
         self.root.destroy()
 
+    def on_tab_changed(self, _):
+        """Showing the selected page (least recently selected pages are released)."""
+        page = self.notebook.nametowidget(self.notebook.select())
+        if page.figure is None:
+            with self.profiler.region(page.country):
+                # the data have been computed in the background in the meantime
+                data = self.slices[page.country].result()
+                page.show(self.visualize(page.country, data, page=True))
+        self.pages[page.country] = page
+        self.pages.move_to_end(page.country)
+
+        while len(self.pages) > self.options['viewer_pages']:
+            _, page = self.pages.popitem(last=False)
+            page.release()
+
     @staticmethod
     def initialize_logging():
         """Initializing the logging (file and console)"""
@@ -93,7 +152,7 @@ class Application:
 
     def log_options(self):
         """Logging of the options."""
-        logging.info("data url: %s", Application.DATA_URL)
+        logging.info("data url: %(data_url)s", self.options)
         logging.info("image resolution: %(width)dx%(height)d pixel", self.options)
         logging.info("country filter: %(country)s", self.options)
         logging.info("image format: %(format)s", self.options)
@@ -101,62 +160,149 @@ class Application:
         logging.info("initial cases: %(initial_cases)d", self.options)
         logging.info("use cache: %(cache)s", self.options)
         logging.info("cache file: %(cache_file)s", self.options)
+        logging.info("cache max age: %(cache_max_age)d seconds", self.options)
+        logging.info("binary cache file: %s", self.binary_cache_file())
         logging.info("transparency: %(transparency)g", self.options)
+        logging.info("viewer pages: %(viewer_pages)d", self.options)
+        logging.info("jobs: %(jobs)d", self.options)
+        logging.info("profile: %(profile)s", self.options)
+        logging.info("average: %(average)d", self.options)
+        logging.info("manifest: %(manifest)s", self.options)
+        logging.info("decimate: %(decimate)s", self.options)
+        logging.info("metric: %(metric)s (%(metric_window)d days)", self.options)
+        logging.info("export: %(export)s", self.options)
+        logging.info("atlas: %(atlas)s (%(atlas_columns)dx%(atlas_rows)d, %(atlas_metric)s)",
+                     self.options)
+
+    def binary_cache_file(self):
+        """Path and filename of the normalized binary cache (next to the cache file)."""
+        return self.options['cache_file'] + '.bin'
+
+    @staticmethod
+    def read_csv(source):
+        """Reading the columns required from the CSV (path or stream)."""
+        import pandas as pd
+        return pd.read_csv(source, usecols=Application.COLUMNS,
+                           dtype={'countriesAndTerritories': 'category',
+                                  'continentExp': 'category'})
+
+    @staticmethod
+    def normalize(df):
+        """Reducing raw CSV data to parsed dates, int32 counts and categorical names."""
+        import pandas as pd
+        normalized = pd.DataFrame({
+            'date': pd.to_datetime(df['dateRep'], format="%d/%m/%Y"),
+            'cases': df['cases'].fillna(0).astype(np.int32),
+            'deaths': df['deaths'].fillna(0).astype(np.int32),
+            'countriesAndTerritories': df['countriesAndTerritories'].astype('category'),
+            'population': df['popData2019'].fillna(0).astype(np.int64),
+            'continent': df['continentExp'].astype('category')
+        })
+        # before: the columns used as read without categorical dtypes (strings per row)
+        logging.info("Normalized %d rows: %.1f MB -> %.1f MB",
+                     len(df), raw_frame_memory(df), frame_memory(normalized))
+        return normalized
+
+    def downloader(self):
+        """Downloader keeping the cache file up to date."""
+        from download import Downloader
+        return Downloader(self.options['data_url'], self.options['cache_file'],
+                          self.options['cache_max_age'])
+
+    def read_cache(self):
+        """Reading the data of the cache file (from the binary cache when valid)."""
+        from columnar import ColumnarCache
+        binary_cache = ColumnarCache(self.binary_cache_file(), self.options['cache_file'])
+        self.version = json.dumps(binary_cache.source_signature(), sort_keys=True)
+        with self.profiler.stage('parse'):
+            if binary_cache.is_valid():
+                self.df = binary_cache.read()
+            else:
+                df = Application.normalize(Application.read_csv(self.options['cache_file']))
+                logging.info("Writing binary cache %s", self.binary_cache_file())
+                # stored in country and date order: indexing the mapped rows copies nothing
+                binary_cache.write(RegionIndex.sort(df, ['countriesAndTerritories']))
+                self.df = binary_cache.read()
 
     def fetch_data(self):
         """Download Corona Data (or use the cache)."""
+        from download import Downloader, refresh
         if self.options['cache']:
-            if not os.path.isfile(self.options['cache_file']):
-                logging.info("Downloading from %s", Application.DATA_URL)
-                response = requests.get(Application.DATA_URL)
-                with open(self.options['cache_file'], 'wb') as stream:
-                    stream.write(response.content)
-
-            self.df = pd.read_csv(self.options['cache_file'])
+            with self.profiler.stage('fetch'):
+                refresh([self.downloader()])
+            self.read_cache()
         else:
-            logging.info("Downloading from %s", Application.DATA_URL)
-            response = requests.get(Application.DATA_URL)
-            self.df = pd.read_csv(StringIO(response.content.decode()))
+            with self.profiler.stage('fetch'):
+                response = Downloader.open(self.options['data_url'])
+            self.version = datetime.now().isoformat()
+            # the content is downloaded while parsing
+            with response, self.profiler.stage('parse', detail='streamed download'):
+                self.df = Application.normalize(Application.read_csv(response.raw))
+
+    def build_index(self):
+        """Sorting the data once by country and date for fast lookup of each country."""
+        self.index = RegionIndex(self.df, ['countriesAndTerritories'])
+        self.df = self.index.df
+        self.trends.update(self.version)
+        self.metrics.update(self.version, self.df)
+
+    def region_metadata(self):
+        """Region names of the cache file (next to the cache file)."""
+        return RegionMetadata(self.options['cache_file'] + '.meta.json', self.options['cache_file'])
+
+    def load_data(self, download=True):
+        """Fetching the data (or reading the cache file only) and indexing them by country."""
+        if download:
+            self.fetch_data()
+        else:
+            self.read_cache()
+        with self.profiler.stage('index'):
+            self.build_index()
+
+        # data of the cache file: keeping the names for --list-countries
+        if (self.options['cache'] or not download) and self.region_metadata().read() is None:
+            self.region_metadata().write(self.region_names())
+
+    def region_names(self):
+        """Names of the countries, of the continents and 'all' (the world)."""
+        return {'countriesAndTerritories': self.index.names('countriesAndTerritories'),
+                'continent': self.metrics.names('continent'), 'all': ['all']}
+
+    def list_countries(self):
+        """Printing the region names (loading the data only when the metadata are outdated)."""
+        regions = self.region_metadata().read()
+        if regions is None:
+            self.load_data(download=not os.path.isfile(self.options['cache_file']))
+            regions = self.region_names()
+        for level in ['countriesAndTerritories', 'continent', 'all']:
+            for name in regions[level]:
+                click.echo(name)
+
+    def contains(self, country_filter):
+        """True when data exist for the country ('all' and the continents are roll-ups)."""
+        return country_filter == 'all' or \
+            self.index.contains('countriesAndTerritories', country_filter) or \
+            self.metrics.contains('continent', country_filter)
+
+    def validate(self, country_filter):
+        """Searching for the country defined in the options (exit when not found)."""
+        if not self.contains(country_filter):
+            logging.error("Country '%s' not found!", country_filter)
+            sys.exit(1)
 
     def provide_concrete_data(self, country_filter):
-        # searching for the country defined in the options
-        if not country_filter == 'all':
-            if not any(self.df.countriesAndTerritories.str.lower().eq(
-                       country_filter).values.flatten()):
-                logging.error("Country '%s' not found!", country_filter)
-                sys.exit(1)
-
-        if country_filter == 'all':
-            temp = self.df.groupby('dateRep').agg({
-                'cases': ['sum'], 'deaths': ['sum'], 'dateRep': ['min'],
-                'countriesAndTerritories': ['min']
-            })
-            temp.columns = ['cases', 'deaths', 'dateRep', 'countriesAndTerritories']
-
-            data = {
-                'date': [pd.to_datetime(entry, format="%d/%m/%Y") for entry in temp['dateRep']],
-                'cases': temp['cases'].values.flatten(),
-                'deaths': temp['deaths'].values.flatten(),
-                'countriesAndTerritories': temp['countriesAndTerritories'].values.flatten()
-            }
+        import pandas as pd
+        self.validate(country_filter)
+
+        if not self.metrics.level(country_filter) == 'country':
+            # world or continent summed up by the metrics engine (all days of the data)
+            dates, values = self.metrics.series(country_filter)
+            df_concrete = pd.DataFrame({'date': dates, 'cases': values['cases'],
+                                        'deaths': values['deaths']})
         else:
-            data = {
-                'date': [pd.to_datetime(entry, format="%d/%m/%Y") for entry in self.df['dateRep']],
-                'cases': self.df['cases'].values.flatten(),
-                'deaths': self.df['deaths'].values.flatten(),
-                'countriesAndTerritories': self.df['countriesAndTerritories'].values.flatten()
-            }
-
-        df_concrete = pd.DataFrame(data)
-
-        if not country_filter == 'all':
-            # filter for concrete country
-            df_concrete = df_concrete[
-                df_concrete.countriesAndTerritories.str.lower().eq(country_filter)]
-
-        # sort by date ascending
-        df_concrete = df_concrete.sort_values(by=['date'])
-        df_concrete = df_concrete.reset_index(drop=True)
+            # rows of a country are already sorted by date
+            df_concrete = self.index.lookup('countriesAndTerritories', country_filter)
+            df_concrete = df_concrete.reset_index(drop=True)
 
         # some information required for all graphs
         first_day = df_concrete['date'].values.flatten()[0]
@@ -165,17 +311,48 @@ class Application:
 
         # allow to filter out rare cases at the beginning (default: take all)
         # that's for visualizing in the graphs only
-        first_value_index = df_concrete.query(
-            'cases >= %d' % self.options['initial_cases']).index[0]
-        df_concrete = df_concrete.iloc[first_value_index:]
+        shown = df_concrete.query('cases >= %d' % self.options['initial_cases']).index
+        if not len(shown):
+            raise NoDataError("No day of '%s' with at least %d cases"
+                              % (country_filter, self.options['initial_cases']))
+        df_concrete = df_concrete.iloc[shown[0]:]
+
+        if not self.options['metric'] == 'per-day':
+            # values of the metric for the days shown (totals are still those of the data)
+            dates, values = self.metrics.series(
+                country_filter, self.options['metric'], self.options['metric_window'])
+            positions = np.searchsorted(dates, df_concrete['date'].values)
+            df_concrete = df_concrete.assign(cases=values['cases'][positions],
+                                             deaths=values['deaths'][positions])
 
         return df_concrete, first_day, sum_of_cases, sum_of_deaths
 
+    def trend_key(self, country_filter, name):
+        """Key of the curves of one country and metric (depends on the visible days)."""
+        return country_filter, name, self.options['initial_cases'], self.options['metric'], \
+            self.options['metric_window']
+
+    def metric_label(self, name):
+        """Label of the values of cases or deaths (see --metric)."""
+        window = self.options['metric_window']
+        return {'per-day': '%s Per Day' % name.title(),
+                'incidence': '%s Per 100k In %d Days' % (name.title(), window),
+                'rolling-sum': '%s In %d Days' % (name.title(), window),
+                'doubling-time': 'Days Until %s Double' % name.title()}[self.options['metric']]
+
+    def compute_trends(self, data):
+        """Fitting the trends of all countries (dictionary of concrete data) in one go."""
+        self.trends.compute({
+            self.trend_key(country_filter, name): df_concrete[name].values
+            for country_filter, (df_concrete, _, _, _) in data.items()
+            for name in ['cases', 'deaths']})
+
     def configure_subplots(self):
         """Define layout, main title and resolution of image."""
+        import matplotlib.pyplot as plt
         fig, main_axes = plt.subplots(nrows=2, ncols=1, sharex=True)
         current_date = datetime.now().date().isoformat()
-        fig.suptitle(Application.DATA_URL + ' (' + current_date + ')', fontsize=8)
+        fig.suptitle(self.options['data_url'] + ' (' + current_date + ')', fontsize=8)
 
         # adjusting figure to show in requested resolution (default: 1024x768 pixel)
         DPI = fig.get_dpi()
@@ -190,78 +367,299 @@ class Application:
         title = 'Corona %s In %s (Total since %s: %d)' % \
             (name.title(), country.title(), first_day_str, total)
 
-        # plot of the concrete data
+        # polynomial fit (and rolling average) computed for all regions before
         x = df_concrete['date'].values.flatten()
-        target.plot(x, df_concrete[name].values.flatten(),
-                    label=name, color='#008000')
+        values = df_concrete[name].values.flatten()
+        curves = self.trends.lookup(self.trend_key(country_filter, name), values)
+        average = curves[self.options['average']] if self.options['average'] else None
+
+        # points the width of the axes can show (all without decimation)
+        keep = Decimation.indices(self.options['decimate'], values, int(target.bbox.width))
+        x, values, trend = x[keep], values[keep], curves['trend'][keep]
+        average = average[keep] if average is not None else None
+
+        if target.lines:
+            # axes of the reused figure
+            Renderer.update(target, x, values, trend, title, average)
+            return
 
-        # square polynomial fit for Corona cases
-        xt = np.arange(len(x))
-        pt = np.poly1d(np.polyfit(xt, df_concrete[name].values.flatten(), 5))
-        target.plot(x, pt(xt), label='squares polynomial fit',
+        # plot of the concrete data
+        target.plot(x, values, label=name, color='#008000')
+        target.plot(x, trend, label='squares polynomial fit',
                     linestyle='dashed', linewidth=0.75, color='#800000')
+        if average is not None:
+            target.plot(x, average, label='%d-day average' % self.options['average'],
+                        linewidth=1.0, color='#000080')
 
         target.set_title(title)
         target.set_xlabel('Date')
-        target.set_ylabel('%s Per Day' % name.title())
+        target.set_ylabel(self.metric_label(name))
         target.tick_params(labelleft=True, labelright=True)
         target.grid(alpha=0.5)
         target.legend(loc='upper left')
 
-    def visualize(self, country_filter, data):
-        """Plotting the data."""
+    def exports(self, country_filter, data):
+        """Files to export as (format, filename, digest of input); unchanged ones are left out."""
+        df_concrete, first_day, sum_of_cases, sum_of_deaths = data
+        digest = RenderManifest.digest(
+            country_filter, str(first_day), int(sum_of_cases), int(sum_of_deaths),
+            df_concrete['date'].values, df_concrete['cases'].values, df_concrete['deaths'].values,
+            TrendEngine.DEGREE, *[self.options[name] for name in Application.RENDER_OPTIONS])
+        exports = [(format, filename, RenderManifest.digest(digest, format))
+                   for format, filename in zip(self.options['format'],
+                                               self.filenames(country_filter))]
+        if self.manifest is None:
+            return exports
+        return [entry for entry in exports if not self.manifest.is_current(*entry[1:])]
+
+    def visualize(self, country_filter, data, page=False, exports=None):
+        """Plotting the data (exporting them unless plotting for a page of the viewer)."""
         df_concrete, first_day, sum_of_cases, sum_of_deaths = data
-        fig, main_axes = self.configure_subplots()
+        if exports is None:
+            exports = [] if page else self.exports(country_filter, data)
+        if self.options['format'] and not page and not exports:
+            logging.info("Images of %s are unchanged", country_filter)
+            return None
+
+        if page or self.template is None:
+            fig, main_axes = self.configure_subplots()
+        else:
+            fig, main_axes = self.template
 
         # ensure that no negative axis is shown
-        main_axes[0].set_ylim(0, df_concrete['cases'].max())
-        main_axes[1].set_ylim(0, df_concrete['deaths'].max())
+        main_axes[0].set_ylim(0, np.nan_to_num(df_concrete['cases'].max()))
+        main_axes[1].set_ylim(0, np.nan_to_num(df_concrete['deaths'].max()))
 
-        self.plot(main_axes[0], 'cases', sum_of_cases, country_filter, df_concrete, first_day)
-        self.plot(main_axes[1], 'deaths', sum_of_deaths, country_filter, df_concrete, first_day)
+        with self.profiler.stage('plot', country_filter, 'cases'):
+            self.plot(main_axes[0], 'cases', sum_of_cases, country_filter, df_concrete, first_day)
+        with self.profiler.stage('plot', country_filter, 'deaths'):
+            self.plot(main_axes[1], 'deaths', sum_of_deaths, country_filter, df_concrete, first_day)
+
+        if page:
+            return fig
 
         # export by given format
-        for format in self.options['format']:
-            filename = 'covid19-%s.%s' % (country_filter, format)
+        for _, filename, _ in exports:
             logging.info("Generating %s" % filename)
-            plt.savefig(filename, format=format)
-
+        Renderer.export(fig, [(format, filename) for format, filename, _ in exports],
+                        self.profiler, country_filter)
+        if self.manifest:
+            for _, filename, digest in exports:
+                self.manifest.record(filename, digest)
+
+        # same figure for next country (memory does not grow with the number of countries)
+        self.template = fig, main_axes
         return fig
 
-    def add_page(self, country, figure):
-        """Adding one page to the notebook."""
-        page = self.page_class(self.notebook, figure)
+    def filenames(self, country_filter):
+        """Filenames of the images for given country (one per format)."""
+        return ['covid19-%s.%s' % (country_filter, format) for format in self.options['format']]
+
+    def add_page(self, country):
+        """Adding one (empty) page to the notebook."""
+        import tkinter as tk
+        page = self.page_class(self.notebook, country)
         page.pack(fill=tk.BOTH, expand=tk.YES)
         self.notebook.add(page, text=country.title())
 
+    def export_next(self, countries):
+        """Exporting the images of one country after the other while the viewer is shown."""
+        country = next(countries, None)
+        if country is not None:
+            self.visualize(country, self.slices[country].result())
+            self.root.after(1, self.export_next, countries)
+
+    def show_viewer(self, countries):
+        """Viewer with one page per country; pages are plotted when selected first."""
+        for country in countries:
+            self.validate(country)
+
+        # data of the pages computed in the background (in order of the pages)
+        with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+            for country in countries:
+                if country not in self.slices:
+                    self.slices[country] = executor.submit(self.provide_concrete_data, country)
+                    self.add_page(country)
+
+            self.root.after(1, self.export_next, iter(self.slices))
+            # event loop (keeps application running)
+            self.root.mainloop()
+
+    def render_parallel(self, countries):
+        """Rendering and exporting the countries with a pool of processes."""
+        for country in countries:
+            self.validate(country)
+
+        # index and roll-ups are inherited (fork) or transferred once per process - not per country
+        with multiprocessing.Pool(self.options['jobs'], initializer=initialize_worker,
+                                  initargs=(self.options, self.index, self.metrics)) as pool:
+            # results in order of the countries for deterministic logging
+            for country, exports in zip(countries, pool.imap(render_region, countries)):
+                if not exports:
+                    logging.info("Images of %s are unchanged", country)
+                for _, filename, digest in exports:
+                    logging.info("Generating %s" % filename)
+                    if self.manifest:
+                        self.manifest.record(filename, digest)
+
+    def regions(self):
+        """Lowercase countries of the options ('*' for all countries)."""
+        countries = []
+        for country in self.options['country']:
+            countries.extend(self.index.names('countriesAndTerritories')
+                             if country == '*' else [country.lower()])
+        return countries
+
+    def series(self, countries):
+        """Per day series, totals and trend lines of the countries (one after the other)."""
+        for country in countries:
+            df_concrete, first_day, sum_of_cases, sum_of_deaths = \
+                self.provide_concrete_data(country)
+            arrays = collections.OrderedDict(
+                [('date', df_concrete['date'].values.astype('datetime64[D]'))])
+            for name in ['cases', 'deaths']:
+                arrays[name] = df_concrete[name].values
+                arrays[name + '_trend'] = self.trends.fit(arrays[name])
+            info = {'first_day': np.datetime_as_string(first_day, unit='D'),
+                    'days': len(df_concrete), 'total_cases': int(sum_of_cases),
+                    'total_deaths': int(sum_of_deaths)}
+            yield country, info, arrays
+
+    def export_series(self, countries):
+        """Writing the series of the countries as data file with JSON index (no images)."""
+        if not SeriesExport.is_available(self.options['export']):
+            logging.error("Export as %s requires pyarrow!", self.options['export'])
+            sys.exit(1)
+        for country in countries:
+            self.validate(country)
+
+        export = SeriesExport('covid19-series', self.options['export'])
+        for filename in export.filenames():
+            logging.info("Generating %s" % filename)
+        metadata = {'data_url': self.options['data_url'], 'version': self.version,
+                    'created': datetime.now().isoformat(),
+                    'initial_cases': self.options['initial_cases'],
+                    'metric': self.options['metric'],
+                    'metric_window': self.options['metric_window'],
+                    'trend_degree': TrendEngine.DEGREE}
+        with self.profiler.stage('export', detail='%d countries' % len(countries)):
+            export.write(self.series(countries), metadata)
+
+    def render_atlas(self, countries):
+        """Rendering the countries as small multiples on the pages of an atlas."""
+        from atlas import Atlas
+        data = {}
+        for country in countries:
+            self.validate(country)
+            data[country] = self.provide_concrete_data(country)
+        self.compute_trends(data)
+
+        metric = self.options['atlas_metric']
+        atlas = Atlas(self.options['atlas_columns'], self.options['atlas_rows'],
+                      self.options['width'], self.options['height'])
+        pages = atlas.pages(list(data))
+        for page, page_countries in enumerate(pages, 1):
+            series = []
+            for country in page_countries:
+                df_concrete = data[country][0]
+                values = df_concrete[metric].values
+                trend = self.trends.lookup(self.trend_key(country, metric), values)['trend']
+                name = country if not country == 'all' else 'All Countries'
+                series.append((name.title(), df_concrete['date'].values, values, trend))
+
+            title = 'Corona %s (%s, %s, page %d of %d)' % (
+                self.metric_label(metric), self.options['data_url'],
+                datetime.now().date().isoformat(),
+                page, len(pages))
+            exports = [(format, 'covid19-atlas-%s-%d.%s' % (metric, page, format))
+                       for format in self.options['format']]
+            with self.profiler.stage('atlas', detail='page %d' % page):
+                atlas.render(title, series, exports)
+
+    def finish(self):
+        """Writing profile and manifest."""
+        self.profiler.write(Application.PROFILE_FILE)
+        if self.manifest:
+            self.manifest.save()
+
     def run(self):
         """Running the application logic."""
         Application.initialize_logging()
 
         self.log_options()
-        self.fetch_data()
+        self.load_data()
 
-        for country in self.options['country']:
-            data = self.provide_concrete_data(country.lower())
-            figure = self.visualize(country.lower(), data)
+        if not self.options['export'] == 'none':
+            self.export_series(self.regions())
+            self.finish()
+            return
 
-            if self.options['viewer']:
-                self.figures.append(figure)
-                self.add_page(country.title(), figure)
+        if self.options['atlas']:
+            self.render_atlas(self.regions())
+            self.finish()
+            return
 
         if self.options['viewer']:
-            # event loop (keeps application running)
-            self.root.mainloop()
+            self.show_viewer(self.regions())
+            self.finish()
+            return
+
+        if self.options['jobs'] > 1:
+            # stages of the worker processes are not recorded
+            with self.profiler.stage('render_parallel'):
+                self.render_parallel(self.regions())
+            self.finish()
+            return
+
+        countries = self.regions()
+        data = {}
+        for country in countries:
+            with self.profiler.stage('provide_concrete_data', country):
+                data[country] = self.provide_concrete_data(country)
+        with self.profiler.stage('trend', detail='%d countries' % len(data)):
+            self.compute_trends(data)
+
+        for country in countries:
+            with self.profiler.region(country):
+                self.visualize(country, data[country])
+
+        self.finish()
+
+
+def initialize_worker(options, index, metrics):
+    """Initializing a worker process with the (read-only) indexed data and roll-ups."""
+    global WORKER  # pylint: disable=global-statement
+    import matplotlib
+    matplotlib.use('Agg')
+    # the main process is logging in order of the countries
+    logging.getLogger().setLevel(logging.WARNING)
+    # the manifest of the last run tells the out-of-date images (it is saved by the main process)
+    WORKER = Application(dict(options, viewer=False, profile=False))
+    WORKER.index = index
+    WORKER.metrics = metrics
+    WORKER.df = index.df
+
+
+def render_region(country):
+    """Rendering the out-of-date images of one country in a worker process."""
+    data = WORKER.provide_concrete_data(country)
+    exports = WORKER.exports(country, data)
+    if exports:
+        WORKER.visualize(country, data, exports=exports)
+    return exports
 
 
 @click.command()
+@click.option('--data-url', default=Application.DATA_URL, type=str, show_default=True,
+              metavar="<URL>", help="URL of the data.")
 @click.option('--width', '-w', default=1024, type=int, show_default=True,
               help="Width in pixels for the image.")
 @click.option('--height', '-h', default=768, type=int, show_default=True,
               help="Height in pixels for the image.")
 @click.option('--country', '-c', default=['Germany'],
               type=str, show_default=True, metavar="<NAME>", multiple=True,
-              help="Country as filter for the data (repeatable).")
+              help="Country as filter for the data (repeatable); continents like Europe and "
+                   "'all' (world) are roll-ups, '*' selects all countries.")
 @click.option('--format', '-f', default=['png'], type=click.Choice(['png', 'svg', 'jpg']),
               show_default=True, multiple=True,
               help="File format for image (repeatable).")
@@ -272,13 +670,61 @@ class Application:
                    " for visualization (totals are not affected)")
 @click.option('--cache/--no-cache', default=False, show_default=True,
               help="Enable/Diable the cache.")
+@click.option('--cache-max-age', default=3600, type=click.IntRange(0, None), show_default=True,
+              metavar="<SECONDS>",
+              help="Seconds the cache file is used before checking for new data.")
 @click.option('--cache-file', default=os.path.join(os.getcwd(), 'covid19.csv'),
               type=str, show_default=True, metavar="<PATH>",
               help="Path and filename of the cache file.")
 @click.option('--transparency', '-a', default=0.8, type=click.FloatRange(0.5, 1.0),
               show_default=True, help="Enables transparency for viewer")
+@click.option('--viewer-pages', default=8, type=click.IntRange(1, None), show_default=True,
+              help="Number of viewer pages keeping their figure (others are plotted again).")
+@click.option('--average', default=0, type=click.IntRange(0, 365), show_default=True,
+              metavar="<DAYS>", help="Plotting the rolling average of given days (0: none).")
+@click.option('--decimate', default='none', type=click.Choice(Decimation.METHODS),
+              show_default=True,
+              help="Reducing long series to the points the image width can show.")
+@click.option('--metric', default='per-day', type=click.Choice(MetricsEngine.METRICS),
+              show_default=True,
+              help="Values plotted for cases and deaths: per day, per 100k population or "
+                   "sum within --metric-window days, or the days until the total doubles.")
+@click.option('--metric-window', default=7, type=click.IntRange(1, 365), show_default=True,
+              metavar="<DAYS>", help="Days of incidence, rolling sum and doubling time.")
+@click.option('--export', default='none',
+              type=click.Choice(['none'] + SeriesExport.FORMATS), show_default=True,
+              help="Writing the series of the countries to covid19-series.<format> with "
+                   "JSON index covid19-series.json instead of images (parquet requires pyarrow).")
+@click.option('--atlas/--no-atlas', default=False, show_default=True,
+              help="All countries as small multiples on pages of an atlas (no viewer).")
+@click.option('--atlas-columns', default=4, type=click.IntRange(1, None), show_default=True,
+              help="Number of columns of an atlas page.")
+@click.option('--atlas-rows', default=4, type=click.IntRange(1, None), show_default=True,
+              help="Number of rows of an atlas page.")
+@click.option('--atlas-metric', default='cases', type=click.Choice(['cases', 'deaths']),
+              show_default=True, help="Data shown by the atlas.")
+@click.option('--manifest/--no-manifest', default=True, show_default=True,
+              help="Skipping images whose data and options are unchanged (covid19-manifest.json).")
+@click.option('--profile/--no-profile', default=False, show_default=True,
+              help="Write time and memory of each stage to visualize-profile.json.")
+@click.option('--profile-hot-region/--no-profile-hot-region', default=False, show_default=True,
+              help="With --profile: cProfile data of the slowest country.")
+@click.option('--jobs', '-j', default=1, type=click.IntRange(1, None), show_default=True,
+              help="Number of processes rendering the countries (without viewer only).")
+@click.option('--list-countries', is_flag=True, default=False,
+              help="Print the country and continent names of the cache file "
+                   "(and 'all') and exit.")
 def main(**options):
     """Visualizing covid19 data with matplotlib, panda and numpy."""
+    if options['list_countries']:
+        # names only (no viewer, no logging)
+        Application(dict(options, viewer=False, manifest=False)).list_countries()
+        return
+
+    if options['atlas'] or options['export'] != 'none':
+        # pages and series are written to files only
+        options['viewer'] = False
+
     application = Application(options)
     application.run()
 